@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Shared --serve loop for scripts that answer JSON commands on stdin.
+
+Each command is one JSON object per line holding the script's CLI options
+by name, e.g. {"action": "search", "search_query": "dragon", "top_k": 5};
+each answer is one JSON line on stdout. Running many commands in one
+process skips interpreter start-up and keeps the script's caches warm.
+"""
+
+import argparse
+import json
+import sys
+
+
+def command_argv(command: dict) -> list:
+    """Turn a serve command such as {"action": "search", "top_k": 5} into CLI arguments.
+
+    A true value passes a flag such as no_access_stats on its own; a false one leaves it out.
+    """
+    argv = []
+    for key, value in command.items():
+        flag = f"--{key.replace('_', '-')}"
+        if value is True:
+            argv.append(flag)
+        elif value is not False:
+            argv += [flag, str(value)]
+    return argv
+
+
+def serve(parser: argparse.ArgumentParser, run, parse_args=None) -> int:
+    """Answer newline-delimited JSON commands on stdin with JSON lines on stdout.
+
+    Each command is parsed with parser (or parse_args(parser, argv) for
+    scripts with extra argument checks) and handed to run, whose result is
+    written back. Invalid commands and failed runs answer {"error": ...}
+    and the loop moves on to the next command.
+    """
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            command = json.loads(line)
+            if not isinstance(command, dict):
+                raise ValueError("Command must be a JSON object")
+            argv = command_argv(command)
+            args = parse_args(parser, argv) if parse_args else parser.parse_args(argv)
+            if args.serve:
+                raise ValueError("Commands cannot use serve")
+            result = run(args)
+        except SystemExit:
+            result = {"error": f"Invalid command: {line.strip()}"}
+        except Exception as e:
+            # One failing command must not end the loop for the ones after it
+            result = {"error": str(e)}
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+    return 0
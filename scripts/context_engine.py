@@ -2,12 +2,27 @@
 """Context engine for building optimized LLM context windows."""
 
 import argparse
+import hashlib
+import heapq
 import json
 import os
 import sys
+import time
 from datetime import datetime, timezone
 from typing import Optional
 
+from data_sync import data_fingerprint
+
+# Fields kept in the per-character summary projections. "class" and "lvl"
+# are optional in the character schema, so lookups go through dict.get.
+CHARACTER_SUMMARY_FIELDS = ("id", "name", "class", "lvl")
+CHARACTER_STATUS_FIELDS = ("id", "name", "hp")
+
+# Built contexts are memoized on disk, keyed by the CLI parameters and a
+# fingerprint of data/, and reused for CONTEXT_CACHE_TTL seconds.
+CONTEXT_CACHE_DIR = "/tmp/ctx_cache"
+CONTEXT_CACHE_TTL = 300
+
 
 def estimate_tokens(text: str) -> int:
     """Estimate token count.
@@ -103,17 +118,20 @@ def load_world_data():
 
 def get_recent_events(sessions: dict, count: int = 20) -> list:
     """Get the most recent events across all sessions."""
-    all_events = []
-    
+    # Decorate with (ts, -position) so ties keep their original order and
+    # the comparison stays on plain tuples rather than a Python key callable.
+    keyed = []
     for sess_id, sess in sessions.items():
         for event in sess.get('events', []):
-            event_copy = event.copy()
-            event_copy['session_id'] = sess_id
-            all_events.append(event_copy)
+            keyed.append((event.get('ts', ''), -len(keyed), sess_id, event))
     
-    # Sort by timestamp descending
-    all_events.sort(key=lambda e: e.get('ts', ''), reverse=True)
-    return all_events[:count]
+    # Copy only the events that make the cut
+    recent = []
+    for _, _, sess_id, event in heapq.nlargest(count, keyed):
+        event_copy = event.copy()
+        event_copy['session_id'] = sess_id
+        recent.append(event_copy)
+    return recent
 
 
 def build_full_game_state(max_tokens: int, include_memories: bool, recent_events: int) -> dict:
@@ -182,9 +200,10 @@ def build_character_focused(focus_ids: list, max_tokens: int, include_memories:
     })
     
     # Other characters (summary only)
+    focus_set = frozenset(focus_ids)
     other_chars = [
-        {"id": c["id"], "name": c.get("name"), "class": c.get("class"), "lvl": c.get("lvl")}
-        for cid, c in characters.items() if cid not in focus_ids
+        dict(zip(CHARACTER_SUMMARY_FIELDS, map(c.get, CHARACTER_SUMMARY_FIELDS)))
+        for cid, c in characters.items() if cid not in focus_set
     ]
     if other_chars:
         context["sections"].append({
@@ -197,7 +216,7 @@ def build_character_focused(focus_ids: list, max_tokens: int, include_memories:
         all_events = get_recent_events(sessions, recent_events * 2)
         relevant_events = [
             e for e in all_events
-            if e.get("actor") in focus_ids or e.get("target") in focus_ids
+            if e.get("actor") in focus_set or e.get("target") in focus_set
         ][:recent_events]
         
         if relevant_events:
@@ -242,7 +261,7 @@ def build_session_focused(focus_ids: list, max_tokens: int, include_memories: bo
     
     # Character summaries
     char_summaries = [
-        {"id": c["id"], "name": c.get("name"), "hp": c.get("hp")}
+        dict(zip(CHARACTER_STATUS_FIELDS, map(c.get, CHARACTER_STATUS_FIELDS)))
         for c in characters.values()
     ]
     context["sections"].append({
@@ -445,6 +464,35 @@ def compress_context(context: dict) -> dict:
     return compressed
 
 
+def context_cache_path(*params) -> str:
+    """Return the cache file for a context built from params and the current data."""
+    key = hashlib.blake2b(repr((params, data_fingerprint())).encode(), digest_size=16).hexdigest()
+    return os.path.join(CONTEXT_CACHE_DIR, f"{key}.json")
+
+
+def read_cached_context(path: str) -> Optional[str]:
+    """Return a cached serialized context if it exists and is within the TTL."""
+    try:
+        if time.time() - os.path.getmtime(path) > CONTEXT_CACHE_TTL:
+            return None
+        with open(path, 'r') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_cached_context(path: str, text: str):
+    """Store a serialized context in the cache, ignoring write failures."""
+    try:
+        os.makedirs(CONTEXT_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
 def main():
     parser = argparse.ArgumentParser(description='Context engine')
     parser.add_argument('--action', required=True,
@@ -458,12 +506,25 @@ def main():
     parser.add_argument('--include-memories', default='true')
     parser.add_argument('--include-recent-events', type=int, default=20)
     parser.add_argument('--params-file', help='Path to params JSON file')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Always rebuild the context instead of using the disk cache')
     
     args = parser.parse_args()
     
     focus_ids = [fid.strip() for fid in args.focus_ids.split(',') if fid.strip()]
     include_memories = args.include_memories.lower() == 'true'
     
+    cache_path = None
+    if args.action in ('build_context', 'get_relevant_context', 'summarize_context', 'compress_context'):
+        cache_path = context_cache_path(args.action, args.context_type, tuple(focus_ids),
+                                        args.max_tokens, include_memories, args.include_recent_events)
+        cached = None if args.no_cache else read_cached_context(cache_path)
+        if cached is not None:
+            with open('/tmp/context_result.json', 'w') as f:
+                f.write(cached)
+            print(cached)
+            return 0
+    
     context_builders = {
         'full_game_state': build_full_game_state,
         'character_focused': build_character_focused,
@@ -489,10 +550,14 @@ def main():
     else:
         result = {"action": args.action, "message": "Action not fully implemented"}
     
+    output = json.dumps(result, indent=2)
+    if cache_path:
+        write_cached_context(cache_path, output)
+    
     with open('/tmp/context_result.json', 'w') as f:
-        json.dump(result, f, indent=2)
+        f.write(output)
     
-    print(json.dumps(result, indent=2))
+    print(output)
     return 0
 
 
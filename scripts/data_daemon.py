@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Long-lived loader daemon that keeps game data resident between CLI calls.
+
+Start it once with ``python scripts/data_daemon.py --socket /tmp/bb-data.sock``
+and point scripts at it with ``BB_DATA_SOCKET=/tmp/bb-data.sock``. Requests
+are a single line (``GET all``, ``GET characters``, ``GET sessions`` or
+``GET world``); replies are a 4-byte big-endian length followed by the JSON
+payload. The data tree is re-read whenever any file under data/ changes.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+
+from data_sync import data_fingerprint, walk_data
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_dumps = orjson.dumps if orjson else (lambda obj: json.dumps(obj).encode())
+
+KEYS = ("all", "characters", "sessions", "world")
+
+# Seconds fetch() waits on a daemon before giving up and letting callers
+# fall back to reading data/ directly
+FETCH_TIMEOUT = 10.0
+
+
+class DataCache:
+    """Serialized views of walk_data(), rebuilt when the data tree changes."""
+
+    def __init__(self):
+        self.fingerprint = None
+        self.payloads = {}
+
+    def get(self, key: str) -> bytes:
+        fingerprint = data_fingerprint()
+        if fingerprint != self.fingerprint:
+            data = walk_data(refresh=True)
+            self.payloads = {k: _dumps(data if k == "all" else data[k]) for k in KEYS}
+            self.fingerprint = fingerprint
+        return self.payloads[key]
+
+
+class DataRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline().decode().strip()
+        verb, _, key = line.partition(" ")
+        if verb == "GET" and key in KEYS:
+            try:
+                payload = self.server.cache.get(key)
+            except ValueError as e:
+                payload = _dumps({"error": f"Failed to load data: {e}"})
+        else:
+            payload = _dumps({"error": f"Unknown request: {line}"})
+        self.wfile.write(struct.pack(">I", len(payload)) + payload)
+
+
+def fetch(socket_path: str, key: str = "all", timeout: float = FETCH_TIMEOUT):
+    """Fetch a dataset from a running daemon.
+    
+    Raises OSError if none is listening, it does not answer within timeout
+    seconds, or it closes the connection before a full reply.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(f"GET {key}\n".encode())
+        with sock.makefile('rb') as f:
+            header = f.read(4)
+            if len(header) < 4:
+                raise OSError("Daemon closed the connection without a reply")
+            (length,) = struct.unpack(">I", header)
+            body = f.read(length)
+            if len(body) < length:
+                raise OSError("Daemon reply was cut short")
+    data = orjson.loads(body) if orjson else json.loads(body)
+    if isinstance(data, dict) and set(data) == {"error"}:
+        raise OSError(data["error"])
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve game data from memory')
+    parser.add_argument('--socket', default='/tmp/bb-data.sock', help='Unix socket path')
+    
+    args = parser.parse_args()
+    
+    if os.path.exists(args.socket):
+        os.remove(args.socket)
+    
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
+    with socketserver.UnixStreamServer(args.socket, DataRequestHandler) as server:
+        server.cache = DataCache()
+        print(f"Serving data on {args.socket}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(args.socket)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
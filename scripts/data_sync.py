@@ -2,57 +2,130 @@
 """Data sync and export utilities."""
 
 import argparse
+import copy
 import json
+import mmap
 import os
-import shutil
+import struct
 import sys
 from datetime import datetime, timezone
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_loads = orjson.loads if orjson else json.loads
+
+
+def _fill_flat(dir_path, out):
+    """Load every JSON file directly under dir_path into out, keyed by id."""
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            if entry.name.endswith('.json') and entry.is_file():
+                data = _load_one(entry.path)
+                if 'id' in data:
+                    out[data['id']] = data
+
+
+def _fill_nested(dir_path, out):
+    """Load each subdirectory of dir_path into out[subdir] via _fill_flat."""
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            if entry.is_dir():
+                out[entry.name] = {}
+                _fill_flat(entry.path, out[entry.name])
+
+
+# Files above this size are memory-mapped and handed to orjson directly,
+# skipping the copy into an intermediate bytes object.
+MMAP_THRESHOLD = 64 * 1024
+
+
+def _load_one(path):
+    """Load a single JSON file."""
+    with open(path, 'rb') as f:
+        if orjson and os.fstat(f.fileno()).st_size > MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                return orjson.loads(view)
+        return _loads(f.read())
+
+
+_DATA = None
+
+
+def _fetch_from_daemon():
+    """Fetch all data from data_daemon.py when BB_DATA_SOCKET points at one."""
+    socket_path = os.environ.get('BB_DATA_SOCKET')
+    if not socket_path:
+        return None
+    from data_daemon import fetch
+    try:
+        return fetch(socket_path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def walk_data(refresh=False):
+    """Load characters, sessions and world data in a single pass over data/."""
+    global _DATA
+    if _DATA is not None and not refresh:
+        return _DATA
+    
+    if not refresh:
+        _DATA = _fetch_from_daemon()
+        if _DATA is not None:
+            return _DATA
+    
+    out = {"characters": {}, "sessions": {}, "world": {}}
+    if os.path.isdir('data'):
+        with os.scandir('data') as top:
+            for sub in top:
+                if not sub.is_dir():
+                    continue
+                if sub.name == 'characters':
+                    _fill_flat(sub.path, out["characters"])
+                elif sub.name == 'sessions':
+                    _fill_flat(sub.path, out["sessions"])
+                elif sub.name == 'world':
+                    _fill_nested(sub.path, out["world"])
+    
+    _DATA = out
+    return out
+
+
+def data_fingerprint(root: str = "data") -> tuple:
+    """Return a cheap (path, mtime, size) fingerprint of every file under root."""
+    entries = []
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir():
+                    stack.append(entry.path)
+                else:
+                    st = entry.stat()
+                    entries.append((entry.path, st.st_mtime_ns, st.st_size))
+    return tuple(sorted(entries))
+
 
 def load_all_characters():
     """Load all character files."""
-    characters = {}
-    chars_dir = "data/characters"
-    if os.path.exists(chars_dir):
-        for filename in os.listdir(chars_dir):
-            if filename.endswith('.json'):
-                with open(os.path.join(chars_dir, filename), 'r') as f:
-                    char = json.load(f)
-                    if 'id' in char:
-                        characters[char['id']] = char
-    return characters
+    return walk_data()["characters"]
 
 
 def load_all_sessions():
     """Load all session files."""
-    sessions = {}
-    sessions_dir = "data/sessions"
-    if os.path.exists(sessions_dir):
-        for filename in os.listdir(sessions_dir):
-            if filename.endswith('.json'):
-                with open(os.path.join(sessions_dir, filename), 'r') as f:
-                    sess = json.load(f)
-                    if 'id' in sess:
-                        sessions[sess['id']] = sess
-    return sessions
+    return walk_data()["sessions"]
 
 
 def load_world_data():
     """Load all world data."""
-    world = {}
-    world_dir = "data/world"
-    if os.path.exists(world_dir):
-        for subdir in os.listdir(world_dir):
-            subpath = os.path.join(world_dir, subdir)
-            if os.path.isdir(subpath):
-                world[subdir] = {}
-                for filename in os.listdir(subpath):
-                    if filename.endswith('.json'):
-                        with open(os.path.join(subpath, filename), 'r') as f:
-                            data = json.load(f)
-                            if 'id' in data:
-                                world[subdir][data['id']] = data
-    return world
+    return walk_data()["world"]
 
 
 def export_to_json(data, output_path):
@@ -65,8 +138,11 @@ def export_to_yaml(data, output_path):
     """Export data to YAML format."""
     try:
         import yaml
+        # The libyaml-backed CSafeDumper is much faster than the pure-Python
+        # dumper; it is only present when PyYAML was built against libyaml.
+        dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
         with open(output_path, 'w') as f:
-            yaml.dump(data, f, default_flow_style=False, allow_unicode=True)
+            yaml.dump(data, f, Dumper=dumper, default_flow_style=False, allow_unicode=True)
     except ImportError:
         # Fallback to JSON if yaml not available
         export_to_json(data, output_path.replace('.yaml', '.json'))
@@ -102,13 +178,13 @@ def export_all(fmt, include_computed):
     
     if include_computed:
         # Add computed game state
-        from get_game_state import reduce, generate_summary
-        state = {"characters": data["characters"].copy()}
+        from get_game_state import replay, generate_summary
+        # replay() updates the state in place; keep the exported characters intact
+        state = {"characters": copy.deepcopy(data["characters"])}
         
         # Apply all session events
         for sess in data["sessions"].values():
-            for event in sess.get("events", []):
-                state = reduce(state, event)
+            replay(state, sess.get("events", []))
         
         data["computed_state"] = generate_summary(state)
     
@@ -172,6 +248,8 @@ def export_world(fmt, include_computed):
 
 def backup_all():
     """Create a backup of all data."""
+    import shutil
+    
     os.makedirs('/tmp/export', exist_ok=True)
     
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
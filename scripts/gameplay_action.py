@@ -2,6 +2,7 @@
 """Execute gameplay actions and log them to session."""
 
 import argparse
+import functools
 import json
 import os
 import random
@@ -10,25 +11,172 @@ import string
 import sys
 from datetime import datetime, timezone
 
+from session_log import append_event
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if orjson:
+    _loads = orjson.loads
+
+    def _dumps(obj, pretty: bool = True) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else None)
+else:
+    _loads = json.loads
+
+    def _dumps(obj, pretty: bool = True) -> bytes:
+        if pretty:
+            return json.dumps(obj, indent=2).encode()
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+
+def _print_json(obj, pretty: bool):
+    """Write obj to stdout as JSON without an intermediate str copy."""
+    sys.stdout.flush()
+    if orjson:
+        option = orjson.OPT_APPEND_NEWLINE | (orjson.OPT_INDENT_2 if pretty else 0)
+        sys.stdout.buffer.write(orjson.dumps(obj, option=option))
+        sys.stdout.buffer.flush()
+    else:
+        json.dump(obj, sys.stdout, indent=2 if pretty else None,
+                  separators=None if pretty else (',', ':'))
+        sys.stdout.write('\n')
+
+
+_ID_ALPHABET = string.ascii_lowercase + string.digits
+
 
 def generate_event_id() -> str:
     """Generate a unique event ID."""
-    chars = string.ascii_lowercase + string.digits
-    suffix = ''.join(random.choice(chars) for _ in range(8))
-    return f"e_{suffix}"
+    return 'e_' + ''.join(random.choices(_ID_ALPHABET, k=8))
+
+
+_WORD_BITS = 64
+_WORD_MASK = (1 << _WORD_BITS) - 1
+
+
+@functools.lru_cache(maxsize=None)
+def _batch_threshold(die_size: int, count: int) -> int:
+    """Rejection threshold for drawing `count` dice of `die_size` from one word."""
+    return (1 << _WORD_BITS) % (die_size ** count)
+
+
+@functools.lru_cache(maxsize=None)
+def _dice_per_word(die_size: int) -> int:
+    """Largest k such that die_size**k fits in one random word."""
+    k = 1
+    while die_size ** (k + 1) <= (1 << _WORD_BITS):
+        k += 1
+    return k
+
+
+def _roll_one(die_size: int, _getrandbits=random.getrandbits) -> int:
+    """Roll a single die with one 64-bit draw and Lemire's rejection test."""
+    threshold = _batch_threshold(die_size, 1)
+    while True:
+        r = _getrandbits(_WORD_BITS) * die_size
+        if r & _WORD_MASK >= threshold:
+            return (r >> _WORD_BITS) + 1
+
+
+def _batch_roll(num_dice: int, die_size: int) -> list:
+    """Roll num_dice dice of die_size faces using one 64-bit draw per batch.
+    
+    Each draw is split into several dice by repeated full-width
+    multiplication (Lemire's batched ranged integers); the final low word
+    is checked against the usual threshold so every batch stays uniform.
+    """
+    if die_size < 1:
+        raise ValueError(f"Invalid die size: {die_size}")
+    if die_size == 1:
+        return [1] * num_dice
+    if die_size > 1 << _WORD_BITS:
+        return [random.randint(1, die_size) for _ in range(num_dice)]
+    if num_dice <= 2:
+        # Splitting a word only pays off from three dice up
+        return [_roll_one(die_size) for _ in range(num_dice)]
+    
+    per_word = _dice_per_word(die_size)
+    rolls = []
+    while len(rolls) < num_dice:
+        count = min(per_word, num_dice - len(rolls))
+        threshold = _batch_threshold(die_size, count)
+        while True:
+            r = random.getrandbits(_WORD_BITS)
+            batch = []
+            for _ in range(count):
+                r *= die_size
+                batch.append((r >> _WORD_BITS) + 1)
+                r &= _WORD_MASK
+            if r >= threshold:
+                break
+        rolls.extend(batch)
+    return rolls
+
+
+# roll_dice hands rolls of at least this many dice to numpy when available.
+NUMPY_MIN_DICE = 8
+_NUMPY_MAX_DIE = 1 << 31
+_rng = None
+
+
+def _numpy_rng():
+    """Return the process-wide numpy Generator, creating it on first use."""
+    global _rng
+    if _rng is None:
+        _rng = np.random.default_rng()
+    return _rng
+
+
+def batch_roll(n: int, num_dice: int, die_size: int, bonus: int = 0) -> tuple:
+    """Roll NdM+B n times and return (totals, faces).
+    
+    With numpy installed, totals is an (n,) array and faces an
+    (n, num_dice) array drawn from a single Generator call; otherwise
+    both are plain lists built from _batch_roll.
+    """
+    if die_size < 1:
+        raise ValueError(f"Invalid die size: {die_size}")
+    if np is None or die_size > _NUMPY_MAX_DIE:
+        faces = [_batch_roll(num_dice, die_size) for _ in range(n)]
+        return [sum(f) + bonus for f in faces], faces
+    
+    dtype = np.int8 if die_size <= 127 else np.int64
+    faces = _numpy_rng().integers(1, die_size + 1, size=(n, num_dice), dtype=dtype)
+    totals = faces.sum(axis=1, dtype=np.int64) + bonus
+    return totals, faces
+
+
+_DICE_RE = re.compile(r'(\d+)d(\d+)([+-]\d+)?')
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_dice(dice_str: str):
+    """Parse NdM+B into (num_dice, die_size, bonus), or None if invalid."""
+    match = _DICE_RE.match(dice_str.lower())
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2)), int(match.group(3) or 0)
 
 
 def roll_dice(dice_str: str) -> tuple:
     """Roll dice and return (total, rolls). Format: NdM+B (e.g., 2d6+3)."""
-    match = re.match(r'(\d+)d(\d+)([+-]\d+)?', dice_str.lower())
-    if not match:
+    parsed = _parse_dice(dice_str)
+    if not parsed:
         return 0, []
     
-    num_dice = int(match.group(1))
-    die_size = int(match.group(2))
-    bonus = int(match.group(3)) if match.group(3) else 0
-    
-    rolls = [random.randint(1, die_size) for _ in range(num_dice)]
+    num_dice, die_size, bonus = parsed
+    if np is not None and num_dice >= NUMPY_MIN_DICE and 1 <= die_size <= _NUMPY_MAX_DIE:
+        rolls = batch_roll(1, num_dice, die_size)[1][0].tolist()
+    else:
+        rolls = _batch_roll(num_dice, die_size)
     total = sum(rolls) + bonus
     return total, rolls
 
@@ -38,26 +186,11 @@ def load_character(char_id: str) -> dict:
     char_path = f"data/characters/{char_id}.json"
     if not os.path.exists(char_path):
         return None
-    with open(char_path, 'r') as f:
-        return json.load(f)
-
-
-def load_session(session_id: str) -> dict:
-    """Load a session file."""
-    session_path = f"data/sessions/{session_id}.json"
-    if not os.path.exists(session_path):
-        raise FileNotFoundError(f"Session not found: {session_path}")
-    with open(session_path, 'r') as f:
-        return json.load(f)
-
-
-def save_session(session_id: str, session: dict):
-    """Save a session file."""
-    session_path = f"data/sessions/{session_id}.json"
-    with open(session_path, 'w') as f:
-        json.dump(session, f, indent=2)
+    with open(char_path, 'rb') as f:
+        return _loads(f.read())
 
 
+@functools.lru_cache(maxsize=64)
 def get_stat_modifier(stat_value: int) -> int:
     """Calculate D&D-style stat modifier."""
     return (stat_value - 10) // 2
@@ -186,7 +319,7 @@ def execute_rest(actor: dict, params: dict) -> dict:
         else:
             # Short rest: restore some HP
             con_mod = get_stat_modifier(actor.get('stats', {}).get('CON', 10))
-            heal = max(1, con_mod + random.randint(1, 6))
+            heal = max(1, con_mod + _roll_one(6))
             new_hp = min(max_hp, current + heal)
             result["hp_restored"] = new_hp - current
             result["new_hp"] = new_hp
@@ -205,7 +338,7 @@ def execute_travel(actor: dict, params: dict) -> dict:
     }
     
     # Random encounter check
-    encounter_roll = random.randint(1, 20)
+    encounter_roll = _roll_one(20)
     result["encounter_check"] = encounter_roll
     result["encounter"] = encounter_roll == 1  # 5% chance
     
@@ -221,14 +354,16 @@ def main():
     parser.add_argument('--actor', required=True, help='Actor character ID')
     parser.add_argument('--target', default='', help='Target character ID')
     parser.add_argument('--params-file', help='Path to JSON file containing parameters')
+    parser.add_argument('--compact', action='store_true',
+                       help='Print compact JSON instead of indented output')
     
     args = parser.parse_args()
     
     # Load parameters
     params = {}
     if args.params_file and os.path.exists(args.params_file):
-        with open(args.params_file, 'r') as f:
-            params = json.load(f)
+        with open(args.params_file, 'rb') as f:
+            params = _loads(f.read())
     
     # Load actor and target characters
     actor = load_character(args.actor)
@@ -274,17 +409,15 @@ def main():
     if args.target:
         event["target"] = args.target
     
-    # Load session and append event
-    session = load_session(args.session)
-    session['events'].append(event)
-    save_session(args.session, session)
+    # Append event to the session log
+    append_event(args.session, event)
     
     # Save result for workflow summary
-    with open('/tmp/action_result.json', 'w') as f:
-        json.dump(result, f, indent=2)
+    with open('/tmp/action_result.json', 'wb') as f:
+        f.write(_dumps(result))
     
     print(f"Action executed: {args.action}")
-    print(json.dumps(result, indent=2))
+    _print_json(result, not args.compact)
     return 0
 
 
@@ -6,22 +6,60 @@ import copy
 import json
 import os
 import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson:
+    _loads = orjson.loads
+
+    def _dumps(obj, pretty: bool = True) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else None)
+else:
+    _loads = json.loads
+
+    def _dumps(obj, pretty: bool = True) -> bytes:
+        if pretty:
+            return json.dumps(obj, indent=2).encode()
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+def _print_json(obj, pretty: bool):
+    """Write obj to stdout as JSON without an intermediate str copy."""
+    sys.stdout.flush()
+    if orjson:
+        option = orjson.OPT_APPEND_NEWLINE | (orjson.OPT_INDENT_2 if pretty else 0)
+        sys.stdout.buffer.write(orjson.dumps(obj, option=option))
+        sys.stdout.buffer.flush()
+    else:
+        json.dump(obj, sys.stdout, indent=2 if pretty else None,
+                  separators=None if pretty else (',', ':'))
+        sys.stdout.write('\n')
+
+
+def _load_one(path: str) -> dict:
+    """Load a single JSON file with one read."""
+    with open(path, 'rb') as f:
+        return _loads(f.read())
 
 
 def load_all_characters() -> dict:
     """Load all character files into a dictionary."""
-    characters = {}
     chars_dir = "data/characters"
+    if not os.path.exists(chars_dir):
+        return {}
     
-    if os.path.exists(chars_dir):
-        for filename in os.listdir(chars_dir):
-            if filename.endswith('.json'):
-                with open(os.path.join(chars_dir, filename), 'r') as f:
-                    char = json.load(f)
-                    if 'id' in char:
-                        characters[char['id']] = char
+    with os.scandir(chars_dir) as it:
+        paths = [entry.path for entry in it if entry.name.endswith('.json')]
+    if not paths:
+        return {}
     
-    return characters
+    # Overlap open/read/parse across files; the work is mostly syscall latency
+    with ThreadPoolExecutor(max_workers=min(16, len(paths))) as ex:
+        return {char['id']: char for char in ex.map(_load_one, paths) if 'id' in char}
 
 
 def load_session(session_id: str) -> dict:
@@ -30,89 +68,398 @@ def load_session(session_id: str) -> dict:
     if not os.path.exists(session_path):
         raise FileNotFoundError(f"Session not found: {session_path}")
     
-    with open(session_path, 'r') as f:
-        return json.load(f)
+    with open(session_path, 'rb') as f:
+        return _loads(f.read())
+
+
+def iter_events(session_id: str):
+    """Yield a session's events one at a time.
+    
+    With ijson installed the events array is parsed incrementally, so peak
+    memory stays at one event regardless of session length; otherwise the
+    whole file is loaded as before.
+    """
+    session_path = f"data/sessions/{session_id}.json"
+    if not os.path.exists(session_path):
+        raise FileNotFoundError(f"Session not found: {session_path}")
+    
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+    
+    if ijson is None:
+        yield from load_session(session_id).get("events", [])
+        return
+    
+    with open(session_path, 'rb', buffering=65536) as f:
+        yield from ijson.items(f, 'events.item', use_float=True)
+
+
+def _h_create_char(s: dict, d: dict, r: dict):
+    """Add a character from a create_char event."""
+    c = d.get("character")
+    if c and "id" in c:
+        s["characters"][c["id"]] = copy.deepcopy(c)
+
+
+def _h_update_char(s: dict, d: dict, r: dict):
+    """Apply an allowed-field patch to a character."""
+    cid = d.get("id")
+    patch = d.get("patch", {})
+    if cid in s["characters"] and isinstance(patch, dict):
+        filtered_patch = {k: copy.deepcopy(v) for k, v in patch.items() if k in ALLOWED_PATCH_FIELDS}
+        if filtered_patch:
+            s["characters"][cid].update(filtered_patch)
+
+
+def _h_gain_item(s: dict, d: dict, r: dict):
+    """Add an item to a character's inventory."""
+    cid = d.get("id")
+    item = d.get("item")
+    if cid in s["characters"] and item is not None:
+        s["characters"][cid].setdefault("inventory", []).append(item)
+
+
+def _h_lose_item(s: dict, d: dict, r: dict):
+    """Remove one copy of an item from a character's inventory."""
+    cid = d.get("id")
+    item = d.get("item")
+    if cid in s["characters"] and item is not None:
+        inv = s["characters"][cid].setdefault("inventory", [])
+        if item in inv:
+            inv.remove(item)
+
+
+def _h_damage(s: dict, d: dict, r: dict):
+    """Reduce a character's current HP, not below zero."""
+    cid = d.get("id")
+    amt = r.get("amount", d.get("amount", 0))
+    char = s["characters"].get(cid) if cid else None
+    if char:
+        hp = char.get("hp", {})
+        if "current" in hp:
+            hp["current"] = max(0, hp.get("current", 0) - amt)
+            char["hp"] = hp
+
+
+def _h_heal(s: dict, d: dict, r: dict):
+    """Restore a character's current HP, not above max."""
+    cid = d.get("id")
+    amt = r.get("amount", d.get("amount", 0))
+    char = s["characters"].get(cid) if cid else None
+    if char:
+        hp = char.get("hp", {})
+        if "current" in hp and "max" in hp:
+            hp["current"] = min(hp["max"], hp.get("current", 0) + amt)
+            char["hp"] = hp
+
+
+ALLOWED_PATCH_FIELDS = frozenset({"id", "name", "class", "lvl", "stats", "hp", "inventory", "tags", "notes"})
+
+# Event type -> handler(state, data, result); unknown types leave the state as is
+_HANDLERS = {
+    "create_char": _h_create_char,
+    "update_char": _h_update_char,
+    "gain_item": _h_gain_item,
+    "lose_item": _h_lose_item,
+    "damage": _h_damage,
+    "heal": _h_heal,
+}
 
 
 def reduce(state: dict, event: dict) -> dict:
-    """Apply an event to the state and return the new state."""
-    s = copy.deepcopy(state)
-    t = event.get("t")
-    d = event.get("data", {})
-    r = event.get("result", {})
+    """Apply an event to the state in place and return it.
     
-    if t == "create_char":
-        c = d.get("character")
-        if c and "id" in c:
-            s["characters"][c["id"]] = c
+    The state owns everything stored in it: objects taken from an event
+    are copied on the way in, so later events never mutate the session.
+    """
+    handler = _HANDLERS.get(event.get("t"))
+    if handler:
+        handler(state, event.get("data", {}), event.get("result", {}))
+    return state
+
+
+# Runs of consecutive damage/heal events at least this long are applied
+# through the HP kernel instead of one handler call per event.
+HP_RUN_THRESHOLD = 64
+
+_OP_DAMAGE = 0
+_OP_HEAL = 1
+_HP_OPS = {"damage": _OP_DAMAGE, "heal": _OP_HEAL}
+
+
+def _hp_kernel(ops, rows, amounts, hp_cur, hp_max, has_max):
+    """Apply damage/heal ops to parallel HP arrays, in event order."""
+    for k in range(len(ops)):
+        i = rows[k]
+        if ops[k] == _OP_DAMAGE:
+            hp_cur[i] = max(0, hp_cur[i] - amounts[k])
+        elif has_max[i]:
+            hp_cur[i] = min(hp_max[i], hp_cur[i] + amounts[k])
+
+
+try:
+    import numba
+    import numpy as np
+except ImportError:
+    numba = np = None
+else:
+    _hp_kernel = numba.njit(cache=True)(_hp_kernel)
+
+
+def _apply_hp_run(state: dict, run: list):
+    """Apply a run of damage/heal events using a struct-of-arrays HP table.
     
-    elif t == "update_char":
-        cid = d.get("id")
-        patch = d.get("patch", {})
-        if cid in s["characters"] and isinstance(patch, dict):
-            allowed = {"id", "name", "class", "lvl", "stats", "hp", "inventory", "tags", "notes"}
-            filtered_patch = {k: v for k, v in patch.items() if k in allowed}
-            if filtered_patch:
-                s["characters"][cid].update(filtered_patch)
-    
-    elif t == "gain_item":
-        cid = d.get("id")
-        item = d.get("item")
-        if cid in s["characters"] and item is not None:
-            s["characters"][cid].setdefault("inventory", []).append(item)
+    Only characters touched by the run get a row. Runs with non-integer HP
+    or amounts go through the regular handlers so results stay identical.
+    """
+    characters = state["characters"]
+    row_of = {}
+    hps, hp_cur, hp_max, has_max = [], [], [], []
+    ops, rows, amounts = [], [], []
     
-    elif t == "lose_item":
+    for event in run:
+        d = event.get("data", {})
+        r = event.get("result", {})
         cid = d.get("id")
-        item = d.get("item")
-        if cid in s["characters"] and item is not None:
-            inv = s["characters"][cid].setdefault("inventory", [])
-            if item in inv:
+        char = characters.get(cid) if cid else None
+        if not char:
+            continue
+        hp = char.get("hp", {})
+        if "current" not in hp:
+            continue
+        amt = r.get("amount", d.get("amount", 0))
+        row = row_of.get(cid)
+        if row is None or hps[row] is not hp:
+            cur, mx = hp["current"], hp.get("max", 0)
+            if type(amt) is not int or type(cur) is not int or type(mx) is not int:
+                for event in run:
+                    reduce(state, event)
+                return
+            row = row_of[cid] = len(hps)
+            hps.append(hp)
+            hp_cur.append(cur)
+            hp_max.append(mx)
+            has_max.append("max" in hp)
+        elif type(amt) is not int:
+            for event in run:
+                reduce(state, event)
+            return
+        ops.append(_HP_OPS[event["t"]])
+        rows.append(row)
+        amounts.append(amt)
+    
+    if np is not None:
+        hp_cur = np.array(hp_cur, dtype=np.int64)
+        _hp_kernel(np.array(ops, dtype=np.int8), np.array(rows, dtype=np.int64),
+                   np.array(amounts, dtype=np.int64), hp_cur,
+                   np.array(hp_max, dtype=np.int64), np.array(has_max, dtype=np.bool_))
+    else:
+        _hp_kernel(ops, rows, amounts, hp_cur, hp_max, has_max)
+    
+    for hp, cur in zip(hps, hp_cur):
+        hp["current"] = int(cur)
+
+
+_ITEM_EVENTS = frozenset({"gain_item", "lose_item"})
+_GONE = object()
+
+
+class _Inventory:
+    """Order-preserving multiset over an inventory list, used during replay.
+    
+    Removed slots are tombstoned and every item keeps a queue of its live
+    slot positions, so gaining and losing an item are O(1) while items()
+    returns exactly the list that append()/remove() would have produced.
+    Raises TypeError if an item is unhashable.
+    """
+    
+    def __init__(self, items: list):
+        self.target = items
+        self._index(items)
+    
+    def _index(self, items: list):
+        self.slots = list(items)
+        self.dead = 0
+        self.where = {}
+        for i, item in enumerate(self.slots):
+            self.where.setdefault(item, deque()).append(i)
+    
+    def add(self, item):
+        self.where.setdefault(item, deque()).append(len(self.slots))
+        self.slots.append(item)
+    
+    def remove(self, item):
+        queue = self.where.get(item)
+        if not queue:
+            return
+        self.slots[queue.popleft()] = _GONE
+        if not queue:
+            del self.where[item]
+        self.dead += 1
+        if self.dead > 32 and self.dead * 2 > len(self.slots):
+            self._index(self.items())
+    
+    def items(self) -> list:
+        return [item for item in self.slots if item is not _GONE]
+
+
+def _apply_item_event(state: dict, event: dict, inventories: dict):
+    """Apply a gain_item/lose_item event through the character's _Inventory.
+    
+    inventories maps character id to its _Inventory, or to None once an
+    unhashable item forced that character back onto the plain handlers.
+    """
+    d = event.get("data", {})
+    cid = d.get("id")
+    item = d.get("item")
+    if cid not in state["characters"] or item is None:
+        return
+    
+    inv = inventories.get(cid, False)
+    if inv is False:
+        try:
+            inv = _Inventory(state["characters"][cid].setdefault("inventory", []))
+        except TypeError:
+            inv = None
+        inventories[cid] = inv
+    if inv is not None:
+        try:
+            if event["t"] == "gain_item":
+                inv.add(item)
+            else:
                 inv.remove(item)
+            return
+        except TypeError:
+            _flush_inventories({cid: inv})
+            inventories[cid] = None
+    reduce(state, event)
+
+
+def _flush_inventories(inventories: dict):
+    """Write tracked inventories back into their character lists."""
+    for inv in inventories.values():
+        if inv is not None:
+            inv.target[:] = inv.items()
+    inventories.clear()
+
+
+def replay(state: dict, events) -> dict:
+    """Apply events to the state in order and return it.
     
-    elif t == "damage":
-        cid = d.get("id")
-        amt = r.get("amount", d.get("amount", 0))
-        char = s["characters"].get(cid) if cid else None
-        if char:
-            hp = char.get("hp", {})
-            if "current" in hp:
-                hp["current"] = max(0, hp.get("current", 0) - amt)
-                char["hp"] = hp
-                s["characters"][cid] = char
-    
-    elif t == "heal":
-        cid = d.get("id")
-        amt = r.get("amount", d.get("amount", 0))
-        char = s["characters"].get(cid) if cid else None
-        if char:
-            hp = char.get("hp", {})
-            if "current" in hp and "max" in hp:
-                hp["current"] = min(hp["max"], hp.get("current", 0) + amt)
-                char["hp"] = hp
-                s["characters"][cid] = char
+    Long runs of damage/heal events are batched through _apply_hp_run and
+    item events go through per-character _Inventory multisets; both are
+    settled before any other event is passed to reduce(). Item and HP
+    events touch disjoint fields, so item events do not break an HP run.
+    """
+    run = []
+    inventories = {}
+    for event in events:
+        t = event.get("t")
+        if t in _HP_OPS:
+            run.append(event)
+            continue
+        if t in _ITEM_EVENTS:
+            _apply_item_event(state, event, inventories)
+            continue
+        if run:
+            _flush_hp_run(state, run)
+            run = []
+        if inventories:
+            _flush_inventories(inventories)
+        reduce(state, event)
+    if run:
+        _flush_hp_run(state, run)
+    _flush_inventories(inventories)
+    return state
+
+
+def _event_character(event: dict):
+    """Return the id of the single character an event can change."""
+    d = event.get("data", {})
+    if event.get("t") == "create_char":
+        c = d.get("character")
+        return c["id"] if c and "id" in c else None
+    return d.get("id")
+
+
+def _replay_partition(characters: dict, events: list) -> dict:
+    """Replay events on a subset of characters and return that subset."""
+    return replay({"characters": characters}, events)["characters"]
+
+
+def parallel_replay(state: dict, events, jobs: int) -> dict:
+    """Apply events to the state across worker processes and return it.
+    
+    Every handler changes exactly one character, so events are split by
+    that character into `jobs` disjoint partitions, each replayed in order
+    in its own process. Characters created during the session are merged
+    back in the order of their first create_char event, so the result
+    matches replay().
+    """
+    characters = state["characters"]
+    buckets = {}
+    first_create = {}
+    for i, event in enumerate(events):
+        if event.get("t") not in _HANDLERS:
+            continue
+        cid = _event_character(event)
+        if cid is None:
+            continue
+        buckets.setdefault(cid, []).append(event)
+        if event["t"] == "create_char" and cid not in characters:
+            first_create.setdefault(cid, i)
+    
+    groups = [({}, []) for _ in range(max(1, min(jobs, len(buckets))))]
+    for n, (cid, cid_events) in enumerate(buckets.items()):
+        group_chars, group_events = groups[n % len(groups)]
+        if cid in characters:
+            group_chars[cid] = characters[cid]
+        group_events.extend(cid_events)
     
-    return s
+    with ProcessPoolExecutor(max_workers=len(groups)) as ex:
+        results = {}
+        for part in ex.map(_replay_partition, *zip(*groups)):
+            results.update(part)
+    
+    merged = {}
+    for cid in list(characters) + sorted(first_create, key=first_create.get):
+        if cid in results:
+            merged[cid] = results[cid]
+        elif cid in characters and cid not in buckets:
+            merged[cid] = characters[cid]
+    characters.clear()
+    characters.update(merged)
+    return state
+
+
+def _flush_hp_run(state: dict, run: list):
+    """Apply a pending damage/heal run, batched only when it is long enough."""
+    if len(run) >= HP_RUN_THRESHOLD:
+        _apply_hp_run(state, run)
+    else:
+        for event in run:
+            reduce(state, event)
 
 
 def generate_summary(state: dict) -> dict:
     """Generate a summary of the game state."""
-    summary = {
-        "total_characters": len(state.get("characters", {})),
-        "characters": []
+    characters = state.get("characters", {})
+    return {
+        "total_characters": len(characters),
+        "characters": [
+            {
+                "id": char_id,
+                "name": char.get("name", "Unknown"),
+                "class": char.get("class", "Unknown"),
+                "level": char.get("lvl", 1),
+                "hp": f"{(hp := char.get('hp', {})).get('current', 0)}/{hp.get('max', 0)}",
+                "tags": char.get("tags", [])
+            }
+            for char_id, char in characters.items()
+        ]
     }
-    
-    for char_id, char in state.get("characters", {}).items():
-        char_summary = {
-            "id": char_id,
-            "name": char.get("name", "Unknown"),
-            "class": char.get("class", "Unknown"),
-            "level": char.get("lvl", 1),
-            "hp": f"{char.get('hp', {}).get('current', 0)}/{char.get('hp', {}).get('max', 0)}",
-            "tags": char.get("tags", [])
-        }
-        summary["characters"].append(char_summary)
-    
-    return summary
 
 
 def main():
@@ -121,15 +468,21 @@ def main():
     parser.add_argument('--format', choices=['summary', 'full'], default='summary',
                        help='Output format')
     
+    parser.add_argument('--jobs', type=int, default=1,
+                       help='Worker processes for replay (default: 1, streamed and serial)')
+    parser.add_argument('--compact', action='store_true',
+                       help='Print compact JSON instead of indented output')
+    
     args = parser.parse_args()
     
     # Load base state from character files
     state = {"characters": load_all_characters()}
     
-    # Load and apply session events
-    session = load_session(args.session)
-    for event in session.get("events", []):
-        state = reduce(state, event)
+    # Stream and apply session events
+    if args.jobs > 1:
+        parallel_replay(state, list(iter_events(args.session)), args.jobs)
+    else:
+        replay(state, iter_events(args.session))
     
     # Output result
     if args.format == 'summary':
@@ -137,7 +490,7 @@ def main():
     else:
         output = state
     
-    print(json.dumps(output, indent=2))
+    _print_json(output, not args.compact)
     return 0
 
 
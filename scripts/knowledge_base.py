@@ -3,20 +3,58 @@
 
 import argparse
 import hashlib
+import heapq
+import itertools
 import json
 import os
 import re
 import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 from typing import Optional
 
+from cli_serve import serve
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+_TOKEN_RE = re.compile(r'\b\w+\b')
+
+# Common words left out of the index
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been',
+    'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will',
+    'would', 'could', 'should', 'may', 'might', 'must', 'shall',
+    'can', 'need', 'dare', 'ought', 'used', 'to', 'of', 'in',
+    'for', 'on', 'with', 'at', 'by', 'from', 'as', 'into',
+    'through', 'during', 'before', 'after', 'above', 'below',
+    'between', 'under', 'again', 'further', 'then', 'once',
+    'and', 'but', 'or', 'nor', 'so', 'yet', 'both', 'either',
+    'neither', 'not', 'only', 'own', 'same', 'than', 'too',
+    'very', 'just', 'also',
+})
+
 
 def ensure_knowledge_dirs():
     """Ensure knowledge base directories exist."""
     dirs = [
         "data/knowledge",
         "data/knowledge/documents",
-        "data/knowledge/index"
+        "data/knowledge/index",
+        "data/knowledge/index/postings"
     ]
     for d in dirs:
         os.makedirs(d, exist_ok=True)
@@ -30,71 +68,188 @@ def generate_doc_id(content: str) -> str:
 
 def tokenize(text: str) -> list:
     """Simple tokenization for search."""
-    # Convert to lowercase and split on non-alphanumeric
-    tokens = re.findall(r'\b\w+\b', text.lower())
-    # Remove common stop words
-    stop_words = {'the', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been',
-                  'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will',
-                  'would', 'could', 'should', 'may', 'might', 'must', 'shall',
-                  'can', 'need', 'dare', 'ought', 'used', 'to', 'of', 'in',
-                  'for', 'on', 'with', 'at', 'by', 'from', 'as', 'into',
-                  'through', 'during', 'before', 'after', 'above', 'below',
-                  'between', 'under', 'again', 'further', 'then', 'once',
-                  'and', 'but', 'or', 'nor', 'so', 'yet', 'both', 'either',
-                  'neither', 'not', 'only', 'own', 'same', 'than', 'too',
-                  'very', 'just', 'also'}
-    return [t for t in tokens if t not in stop_words and len(t) > 2]
-
-
-def load_index() -> dict:
-    """Load the knowledge base index."""
-    index_path = "data/knowledge/index/main.json"
-    if os.path.exists(index_path):
-        with open(index_path, 'r') as f:
-            return json.load(f)
-    return {
-        "documents": {},
-        "inverted_index": {},
-        "doc_types": {},
-        "statistics": {
-            "total_documents": 0,
-            "total_tokens": 0
-        },
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "updated_at": datetime.now(timezone.utc).isoformat()
-    }
+    # Lowercase, split on non-alphanumeric and drop short and stop words
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 2 and t not in STOP_WORDS]
+
 
+INDEX_DIR = "data/knowledge/index"
+META_PATH = f"{INDEX_DIR}/meta.json"
+POSTINGS_DIR = f"{INDEX_DIR}/postings"
+# Single-file index written before postings were sharded; migrated on first save
+LEGACY_INDEX_PATH = f"{INDEX_DIR}/main.json"
 
-def save_index(index: dict):
-    """Save the knowledge base index."""
+# path -> ((mtime_ns, size), parsed JSON), reused while the file is unchanged
+_INDEX_CACHE = {}
+
+
+def _invalidate_index_cache():
+    """Drop cached index files, e.g. before they are mutated or rewritten."""
+    _INDEX_CACHE.clear()
+
+
+def shard_name(token: str) -> str:
+    """Return the postings shard a token is stored in."""
+    return token[:2]
+
+
+def _read_index_file(path: str) -> Optional[dict]:
+    """Parse an index JSON file, reusing the cached copy while it is unchanged."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _INDEX_CACHE.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path, 'rb') as f:
+        data = f.read()
+    parsed = orjson.loads(data) if orjson else json.loads(data)
+    _INDEX_CACHE[path] = (key, parsed)
+    return parsed
+
+
+def _write_index_file(path: str, data: dict):
+    """Write an index JSON file compactly and atomically.
+    
+    The file is written next to its destination and moved into place, so a
+    crash mid-save never leaves a truncated shard or meta file behind.
+    """
+    tmp_path = path + '.tmp'
+    if orjson:
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(data))
+    else:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def load_index(tokens=None) -> dict:
+    """Load the knowledge base index.
+    
+    The inverted index is sharded by token prefix; only the shards holding
+    `tokens` are loaded, or every shard when tokens is None. Callers that
+    modify the returned index must call _invalidate_index_cache() first, so
+    a failed update never leaves a half-modified cached copy.
+    """
+    meta = _read_index_file(META_PATH)
+    if meta is None:
+        legacy = _read_index_file(LEGACY_INDEX_PATH)
+        if legacy is not None:
+            return legacy
+        now = datetime.now(timezone.utc).isoformat()
+        return {
+            "documents": {},
+            "inverted_index": {},
+            "doc_types": {},
+            "statistics": {
+                "total_documents": 0,
+                "total_tokens": 0
+            },
+            "created_at": now,
+            "updated_at": now
+        }
+    
+    if tokens is None:
+        try:
+            shards = [name[:-5] for name in os.listdir(POSTINGS_DIR) if name.endswith('.json')]
+        except FileNotFoundError:
+            shards = []
+    else:
+        shards = {shard_name(t) for t in tokens}
+    
+    inverted_index = {}
+    for shard in shards:
+        postings = _read_index_file(f"{POSTINGS_DIR}/{shard}.json")
+        if postings:
+            inverted_index.update(postings)
+    
+    return {**meta, "inverted_index": inverted_index}
+
+
+def save_index(index: dict, prune: bool = False):
+    """Save the knowledge base index.
+    
+    Every shard present in index["inverted_index"] is rewritten in full, so
+    it must hold all tokens of the shards it touches (load_index loads
+    whole shards). With prune, shard files not in the index are deleted.
+    The index is machine-read only, so it is stored compact; document files
+    stay indented for people browsing data/knowledge.
+    """
     ensure_knowledge_dirs()
     index["updated_at"] = datetime.now(timezone.utc).isoformat()
-    index_path = "data/knowledge/index/main.json"
-    with open(index_path, 'w') as f:
-        json.dump(index, f, indent=2)
+    
+    shards = {}
+    for token, postings in index["inverted_index"].items():
+        shards.setdefault(shard_name(token), {})[token] = postings
+    for shard, postings in shards.items():
+        _write_index_file(f"{POSTINGS_DIR}/{shard}.json", postings)
+    if prune:
+        for name in os.listdir(POSTINGS_DIR):
+            if name.endswith('.json') and name[:-5] not in shards:
+                os.remove(f"{POSTINGS_DIR}/{name}")
+    
+    _write_index_file(META_PATH, {k: v for k, v in index.items() if k != "inverted_index"})
+    if os.path.exists(LEGACY_INDEX_PATH):
+        os.remove(LEGACY_INDEX_PATH)
+    _invalidate_index_cache()
 
 
-def add_document(doc_type: str, doc_id: str, content: str) -> dict:
-    """Add a document to the knowledge base."""
-    ensure_knowledge_dirs()
+# Leading characters of content kept in each document file
+PREVIEW_CHARS = 512
+
+
+def document_preview(doc: dict) -> str:
+    """Return a document file's preview text, falling back to legacy full content."""
+    preview = doc.get("preview")
+    if preview is None:
+        preview = doc.get("content", "")[:PREVIEW_CHARS]
+    return preview
+
+
+def _data_source_path(path: Optional[str]) -> Optional[str]:
+    """Return path relative to the repo if it names a file under data/, else None."""
+    if not path:
+        return None
+    rel = os.path.relpath(path)
+    if rel.split(os.sep, 1)[0] != "data" or not os.path.isfile(rel):
+        return None
+    return rel.replace(os.sep, "/")
+
+
+def _build_document(doc_type: str, doc_id: str, content: str, source_path: Optional[str] = None) -> dict:
+    """Tokenize content into a document record.
     
+    When source_path is a repo file under data/, only a preview of the
+    content is kept and source_path points back at the full text; any
+    other content is stored whole.
+    """
     if not doc_id:
         doc_id = generate_doc_id(content)
     
     # Tokenize content
     tokens = tokenize(content)
-    token_freq = {}
-    for token in tokens:
-        token_freq[token] = token_freq.get(token, 0) + 1
     
-    document = {
-        "id": doc_id,
-        "type": doc_type,
-        "content": content,
-        "tokens": token_freq,
+    document = {"id": doc_id, "type": doc_type}
+    source_path = _data_source_path(source_path)
+    if source_path:
+        document["preview"] = content[:PREVIEW_CHARS]
+        document["source_path"] = source_path
+    else:
+        document["content"] = content
+    document.update({
+        "tokens": Counter(tokens),
         "token_count": len(tokens),
         "created_at": datetime.now(timezone.utc).isoformat()
-    }
+    })
+    return document
+
+
+def _store_document(index: dict, document: dict) -> dict:
+    """Write a document file and record it in an in-memory index."""
+    doc_id = document["id"]
+    doc_type = document["type"]
     
     # Save document
     doc_path = f"data/knowledge/documents/{doc_id}.json"
@@ -102,18 +257,17 @@ def add_document(doc_type: str, doc_id: str, content: str) -> dict:
         json.dump(document, f, indent=2)
     
     # Update index
-    index = load_index()
-    
     index["documents"][doc_id] = {
         "type": doc_type,
-        "token_count": len(tokens),
+        "token_count": document["token_count"],
         "created_at": document["created_at"]
     }
     
     # Update inverted index
-    for token, freq in token_freq.items():
+    for token, freq in document["tokens"].items():
         if token not in index["inverted_index"]:
             index["inverted_index"][token] = {}
+            index["statistics"]["total_tokens"] += 1
         index["inverted_index"][token][doc_id] = freq
     
     # Update type index
@@ -124,28 +278,121 @@ def add_document(doc_type: str, doc_id: str, content: str) -> dict:
     
     # Update statistics
     index["statistics"]["total_documents"] = len(index["documents"])
-    index["statistics"]["total_tokens"] = len(index["inverted_index"])
     
+    return {"added": True, "document_id": doc_id, "token_count": document["token_count"]}
+
+
+def _add_document_to_index(index: dict, doc_type: str, doc_id: str, content: str,
+                           source_path: Optional[str] = None) -> dict:
+    """Write a document file and record it in an in-memory index."""
+    return _store_document(index, _build_document(doc_type, doc_id, content, source_path))
+
+
+def add_document(doc_type: str, doc_id: str, content: str, source_path: Optional[str] = None) -> dict:
+    """Add a document to the knowledge base."""
+    ensure_knowledge_dirs()
+    index = load_index(tokenize(content))
+    _invalidate_index_cache()
+    result = _add_document_to_index(index, doc_type, doc_id, content, source_path)
     save_index(index)
-    
-    return {"added": True, "document_id": doc_id, "token_count": len(tokens)}
+    return result
+
+
+# Searches with at least this many candidates are scored on NumPy arrays
+NUMPY_MIN_CANDIDATES = 1000
+
+# Append-only doc_id -> row table shared by all cached posting arrays
+_DOC_ROWS = {}
+# token -> (posting dict, rows, freqs); valid while the posting dict is the cached one
+_POSTING_ARRAYS = {}
+# (documents dict, token_count per row) for the current index meta
+_TOKEN_COUNTS = [None, None]
+
+
+def _doc_row(doc_id: str) -> int:
+    """Return the array row for a document id, assigning one if new."""
+    row = _DOC_ROWS.get(doc_id)
+    if row is None:
+        row = _DOC_ROWS[doc_id] = len(_DOC_ROWS)
+    return row
+
+
+def _posting_arrays(token: str, token_docs: dict) -> tuple:
+    """Return (rows, freqs) arrays for a posting dict, cached per loaded shard."""
+    cached = _POSTING_ARRAYS.get(token)
+    if cached and cached[0] is token_docs:
+        return cached[1], cached[2]
+    rows = np.fromiter((_doc_row(d) for d in token_docs), dtype=np.int64, count=len(token_docs))
+    freqs = np.fromiter(token_docs.values(), dtype=np.float64, count=len(token_docs))
+    _POSTING_ARRAYS[token] = (token_docs, rows, freqs)
+    return rows, freqs
+
+
+def _token_count_array(documents: dict):
+    """Return token_count per document row (1 where unknown), cached per meta."""
+    counts = _TOKEN_COUNTS[1]
+    if _TOKEN_COUNTS[0] is not documents or len(counts) < len(_DOC_ROWS):
+        counts = np.ones(len(_DOC_ROWS), dtype=np.float64)
+        for doc_id, row in _DOC_ROWS.items():
+            counts[row] = documents.get(doc_id, {}).get("token_count", 1)
+        _TOKEN_COUNTS[0] = documents
+        _TOKEN_COUNTS[1] = counts
+    return counts
+
+
+def _accumulate_token_py(scores, counts, rows, freqs, idf):
+    """Add one query token's TF-IDF contribution to each of its documents.
+    
+    Written as an element loop for numba to compile; without numba,
+    _score_with_numpy does the same update as one vectorized expression.
+    """
+    for j in range(rows.shape[0]):
+        r = rows[j]
+        scores[r] += (freqs[j] / counts[r]) * idf
+
+
+_accumulate_token = None
+if numba is not None:
+    _accumulate_token = numba.njit(cache=True)(_accumulate_token_py)
+
+
+def _score_with_numpy(postings: dict, query_tokens: list, idf: dict, documents: dict):
+    """Accumulate TF-IDF scores for every document row in query-token order."""
+    arrays = {t: _posting_arrays(t, p) for t, p in postings.items()}
+    counts = _token_count_array(documents)
+    scores = np.zeros(len(_DOC_ROWS), dtype=np.float64)
+    for t in query_tokens:
+        if t in arrays:
+            rows, freqs = arrays[t]
+            if _accumulate_token is not None:
+                _accumulate_token(scores, counts, rows, freqs, float(idf[t]))
+            else:
+                scores[rows] += (freqs / counts[rows]) * idf[t]
+    return scores
 
 
 def search_documents(query: str, doc_type: Optional[str], top_k: int, filters: dict) -> dict:
     """Search documents using TF-IDF-like scoring."""
-    index = load_index()
-    
     # Tokenize query
     query_tokens = tokenize(query)
     
     if not query_tokens:
         return {"query": query, "results": [], "message": "No valid search terms"}
     
+    index = load_index(query_tokens)
+    
+    # Posting lists and IDF for each query token present in the index
+    inverted_index = index["inverted_index"]
+    total_docs = index["statistics"]["total_documents"]
+    postings = {t: inverted_index[t] for t in query_tokens if t in inverted_index}
+    idf = {t: 1 + (total_docs / len(p)) if p else 1 for t, p in postings.items()}
+    # Repeated query tokens count once per occurrence, as before
+    weighted = [(postings[t], idf[t]) for t in query_tokens if t in postings]
+    
     # Get candidate documents
     candidate_docs = set()
-    for token in query_tokens:
-        if token in index["inverted_index"]:
-            candidate_docs.update(index["inverted_index"][token].keys())
+    for token_docs in postings.values():
+        candidate_docs.update(token_docs.keys())
     
     # Filter by type
     if doc_type:
@@ -154,27 +401,28 @@ def search_documents(query: str, doc_type: Optional[str], top_k: int, filters: d
     
     # Score documents
     scores = {}
-    total_docs = index["statistics"]["total_documents"]
-    
-    for doc_id in candidate_docs:
-        score = 0
-        doc_info = index["documents"].get(doc_id, {})
-        doc_token_count = doc_info.get("token_count", 1)
-        
-        for token in query_tokens:
-            if token in index["inverted_index"]:
-                token_docs = index["inverted_index"][token]
-                if doc_id in token_docs:
-                    # TF: term frequency in document
-                    tf = token_docs[doc_id] / doc_token_count
-                    # IDF: inverse document frequency
-                    idf = 1 + (total_docs / len(token_docs)) if token_docs else 1
-                    score += tf * idf
-        
-        scores[doc_id] = score
+    documents = index["documents"]
+    
+    if np is not None and len(candidate_docs) >= NUMPY_MIN_CANDIDATES:
+        # Same per-document accumulation order as the loop below, so the
+        # float results are identical
+        row_scores = _score_with_numpy(postings, query_tokens, idf, documents)
+        scores = {doc_id: float(row_scores[_DOC_ROWS[doc_id]]) for doc_id in candidate_docs}
+    else:
+        for doc_id in candidate_docs:
+            score = 0
+            doc_token_count = documents.get(doc_id, {}).get("token_count", 1)
+            
+            for token_docs, token_idf in weighted:
+                freq = token_docs.get(doc_id)
+                if freq is not None:
+                    # TF-IDF: term frequency in document times inverse document frequency
+                    score += (freq / doc_token_count) * token_idf
+            
+            scores[doc_id] = score
     
     # Sort by score
-    sorted_docs = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
+    sorted_docs = heapq.nlargest(top_k, scores.items(), key=lambda x: x[1])
     
     # Load document contents for results
     results = []
@@ -187,7 +435,7 @@ def search_documents(query: str, doc_type: Optional[str], top_k: int, filters: d
                 "id": doc_id,
                 "type": doc.get("type"),
                 "score": round(score, 4),
-                "content_preview": doc.get("content", "")[:300],
+                "content_preview": document_preview(doc)[:300],
                 "token_count": doc.get("token_count")
             })
     
@@ -201,7 +449,7 @@ def search_documents(query: str, doc_type: Optional[str], top_k: int, filters: d
 
 def get_related(doc_id: str, top_k: int) -> dict:
     """Get documents related to a given document."""
-    index = load_index()
+    index = load_index(())
     
     if doc_id not in index["documents"]:
         return {"error": f"Document not found: {doc_id}"}
@@ -216,7 +464,8 @@ def get_related(doc_id: str, top_k: int) -> dict:
     
     # Get top tokens from source document
     source_tokens = source_doc.get("tokens", {})
-    top_tokens = sorted(source_tokens.items(), key=lambda x: x[1], reverse=True)[:20]
+    top_tokens = heapq.nlargest(20, source_tokens.items(), key=lambda x: x[1])
+    index["inverted_index"] = load_index([token for token, _ in top_tokens])["inverted_index"]
     
     # Find related documents
     related_scores = {}
@@ -227,7 +476,7 @@ def get_related(doc_id: str, top_k: int) -> dict:
                     related_scores[related_id] = related_scores.get(related_id, 0) + (freq * related_freq)
     
     # Sort and limit
-    sorted_related = sorted(related_scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
+    sorted_related = heapq.nlargest(top_k, related_scores.items(), key=lambda x: x[1])
     
     results = []
     for related_id, score in sorted_related:
@@ -239,7 +488,7 @@ def get_related(doc_id: str, top_k: int) -> dict:
                 "id": related_id,
                 "type": related_doc.get("type"),
                 "similarity_score": round(score, 4),
-                "content_preview": related_doc.get("content", "")[:200]
+                "content_preview": document_preview(related_doc)[:200]
             })
     
     return {
@@ -249,57 +498,121 @@ def get_related(doc_id: str, top_k: int) -> dict:
     }
 
 
+def load_session_head(path: str, max_events: int) -> dict:
+    """Load a session's id, campaign and first max_events events.
+    
+    With ijson installed only the head of the file is parsed, so long
+    sessions are never materialized; otherwise the whole file is loaded.
+    """
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+    
+    if ijson is None:
+        with open(path, 'r') as f:
+            sess = json.load(f)
+        if 'events' in sess:
+            sess['events'] = sess['events'][:max_events]
+        return sess
+    
+    head = {}
+    with open(path, 'rb') as f:
+        for key in ('id', 'campaign'):
+            f.seek(0)
+            for value in ijson.items(f, key, use_float=True):
+                head[key] = value
+                break
+        f.seek(0)
+        head['events'] = list(itertools.islice(ijson.items(f, 'events.item', use_float=True), max_events))
+    return head
+
+
+def _character_source(path: str, name: str) -> tuple:
+    """Return (doc_type, doc_id, content) for a character file."""
+    with open(path, 'r') as f:
+        char = json.load(f)
+    content = f"Character: {char.get('name', '')}. Class: {char.get('class', '')}. "
+    content += f"Notes: {char.get('notes', '')}. Tags: {', '.join(char.get('tags', []))}."
+    return "character", char.get('id', name), content
+
+
+def _session_source(path: str, name: str) -> tuple:
+    """Return (doc_type, doc_id, content) for a session file."""
+    sess = load_session_head(path, 50)
+    
+    # Create content from events
+    content_parts = [f"Session: {sess.get('id', '')}. Campaign: {sess.get('campaign', '')}."]
+    for event in sess.get('events', []):
+        event_data = event.get('data', {})
+        if isinstance(event_data, dict):
+            content_parts.append(json.dumps(event_data))
+    
+    return "session", sess.get('id', name), " ".join(content_parts)
+
+
+def _world_source(path: str, name: str) -> tuple:
+    """Return (doc_type, doc_id, content) for a world entity file."""
+    with open(path, 'r') as f:
+        entity = json.load(f)
+    return "world_lore", entity.get('id', name), json.dumps(entity)
+
+
+def _memory_source(path: str, name: str) -> tuple:
+    """Return (doc_type, doc_id, content) for a memory file."""
+    with open(path, 'r') as f:
+        memory = json.load(f)
+    return "memory", name, json.dumps(memory.get("content", {}))
+
+
+# index_all count key -> source loader
+_SOURCES = {
+    "characters": _character_source,
+    "sessions": _session_source,
+    "world": _world_source,
+    "memories": _memory_source,
+}
+
+# index_all tokenizes in worker processes from this many source files up
+INDEX_PARALLEL_MIN = 64
+
+
+def _build_source_document(kind: str, path: str, name: str) -> dict:
+    """Load one source file and tokenize it; runs in index_all's workers."""
+    return _build_document(*_SOURCES[kind](path, name), source_path=path)
+
+
 def index_all() -> dict:
-    """Index all game data into the knowledge base."""
+    """Index all game data into the knowledge base.
+    
+    Source files are read and tokenized in parallel once there are enough
+    of them; documents are then written and folded into the index in order
+    in this process, so the result matches a serial run.
+    """
     ensure_knowledge_dirs()
     indexed = {"characters": 0, "sessions": 0, "world": 0, "memories": 0}
+    tasks = []
     
-    # Index characters
-    chars_dir = "data/characters"
-    if os.path.exists(chars_dir):
-        for filename in os.listdir(chars_dir):
-            if filename.endswith('.json'):
-                with open(os.path.join(chars_dir, filename), 'r') as f:
-                    char = json.load(f)
-                content = f"Character: {char.get('name', '')}. Class: {char.get('class', '')}. "
-                content += f"Notes: {char.get('notes', '')}. Tags: {', '.join(char.get('tags', []))}."
-                add_document("character", char.get('id', filename), content)
-                indexed["characters"] += 1
-    
-    # Index sessions
-    sessions_dir = "data/sessions"
-    if os.path.exists(sessions_dir):
-        for filename in os.listdir(sessions_dir):
-            if filename.endswith('.json'):
-                with open(os.path.join(sessions_dir, filename), 'r') as f:
-                    sess = json.load(f)
-                
-                # Create content from events
-                content_parts = [f"Session: {sess.get('id', '')}. Campaign: {sess.get('campaign', '')}."]
-                for event in sess.get('events', [])[:50]:  # Limit events
-                    event_data = event.get('data', {})
-                    if isinstance(event_data, dict):
-                        content_parts.append(json.dumps(event_data))
-                
-                content = " ".join(content_parts)
-                add_document("session", sess.get('id', filename), content)
-                indexed["sessions"] += 1
+    # Characters and sessions
+    for kind, dir_path in (("characters", "data/characters"), ("sessions", "data/sessions")):
+        if os.path.exists(dir_path):
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if entry.name.endswith('.json') and entry.is_file():
+                        tasks.append((kind, entry.path, entry.name))
     
-    # Index world data
+    # World data
     world_dir = "data/world"
     if os.path.exists(world_dir):
-        for subdir in os.listdir(world_dir):
-            subpath = os.path.join(world_dir, subdir)
-            if os.path.isdir(subpath):
-                for filename in os.listdir(subpath):
-                    if filename.endswith('.json'):
-                        with open(os.path.join(subpath, filename), 'r') as f:
-                            entity = json.load(f)
-                        content = json.dumps(entity)
-                        add_document("world_lore", entity.get('id', filename), content)
-                        indexed["world"] += 1
-    
-    # Index memories
+        with os.scandir(world_dir) as subdirs:
+            for subdir in subdirs:
+                if subdir.is_dir():
+                    with os.scandir(subdir.path) as it:
+                        for entry in it:
+                            if entry.name.endswith('.json') and entry.is_file():
+                                tasks.append(("world", entry.path, entry.name))
+    
+    # Memories
     memory_index_path = "data/memory/_index/index.json"
     if os.path.exists(memory_index_path):
         with open(memory_index_path, 'r') as f:
@@ -309,18 +622,30 @@ def index_all() -> dict:
             cat = memory_info.get("category", "custom")
             memory_path = f"data/memory/{cat}/{memory_id}.json"
             if os.path.exists(memory_path):
-                with open(memory_path, 'r') as f:
-                    memory = json.load(f)
-                content = json.dumps(memory.get("content", {}))
-                add_document("memory", memory_id, content)
-                indexed["memories"] += 1
+                tasks.append(("memories", memory_path, memory_id))
     
+    index = load_index()
+    _invalidate_index_cache()
+    
+    if len(tasks) >= INDEX_PARALLEL_MIN:
+        workers = os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            documents = list(ex.map(_build_source_document, *zip(*tasks),
+                                    chunksize=max(1, len(tasks) // (workers * 4))))
+    else:
+        documents = [_build_source_document(*task) for task in tasks]
+    
+    for (kind, _, _), document in zip(tasks, documents):
+        _store_document(index, document)
+        indexed[kind] += 1
+    
+    save_index(index)
     return {"indexed": True, "counts": indexed}
 
 
 def get_statistics() -> dict:
     """Get knowledge base statistics."""
-    index = load_index()
+    index = load_index(())
     
     type_counts = {}
     for doc_type, doc_ids in index.get("doc_types", {}).items():
@@ -345,9 +670,36 @@ def export_index() -> dict:
     return {"exported": True, "path": export_path, "statistics": get_statistics()}
 
 
+def _stored_document(doc: dict) -> Optional[dict]:
+    """Turn a saved document file back into a document record without re-tokenizing.
+    
+    Returns None when the file lacks an id or its token counts.
+    """
+    tokens = doc.get("tokens")
+    if not doc.get("id") or not isinstance(tokens, dict) or "token_count" not in doc:
+        return None
+    document = {"id": doc["id"], "type": doc.get("type", "unknown")}
+    source_path = _data_source_path(doc.get("source_path"))
+    if source_path:
+        document["preview"] = document_preview(doc)
+        document["source_path"] = source_path
+    elif "content" in doc:
+        document["content"] = doc["content"]
+    else:
+        # Preview-only file whose source is gone; keep what is left
+        document["preview"] = document_preview(doc)
+    document.update({
+        "tokens": tokens,
+        "token_count": doc["token_count"],
+        "created_at": datetime.now(timezone.utc).isoformat()
+    })
+    return document
+
+
 def rebuild_index() -> dict:
     """Rebuild the entire index from documents."""
     # Clear existing index
+    now = datetime.now(timezone.utc).isoformat()
     index = {
         "documents": {},
         "inverted_index": {},
@@ -356,10 +708,10 @@ def rebuild_index() -> dict:
             "total_documents": 0,
             "total_tokens": 0
         },
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "updated_at": datetime.now(timezone.utc).isoformat()
+        "created_at": now,
+        "updated_at": now
     }
-    save_index(index)
+    ensure_knowledge_dirs()
     
     # Re-index all documents
     docs_dir = "data/knowledge/documents"
@@ -371,28 +723,39 @@ def rebuild_index() -> dict:
                 with open(os.path.join(docs_dir, filename), 'r') as f:
                     doc = json.load(f)
                 
-                # Re-add to index
-                add_document(doc.get("type", "unknown"), doc.get("id"), doc.get("content", ""))
+                # Re-add to index, reusing the saved token counts when present
+                document = _stored_document(doc)
+                if document is None:
+                    document = _build_document(doc.get("type", "unknown"), doc.get("id"),
+                                               doc.get("content", ""), doc.get("source_path"))
+                _store_document(index, document)
                 rebuilt += 1
     
+    save_index(index, prune=True)
     return {"rebuilt": True, "documents_processed": rebuilt}
 
 
-def main():
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command-line parser, also used for --serve commands."""
     parser = argparse.ArgumentParser(description='Knowledge base operations')
-    parser.add_argument('--action', required=True,
-                       choices=['index_all', 'add_document', 'search', 'get_related',
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--action',
+                      choices=['index_all', 'add_document', 'search', 'get_related',
                                'update_embeddings', 'get_statistics', 'export_index',
                                'rebuild_index'])
+    mode.add_argument('--serve', action='store_true',
+                      help='Answer JSON commands read line by line from stdin')
     parser.add_argument('--document-type', default='custom')
     parser.add_argument('--document-id', default='')
     parser.add_argument('--search-query', default='')
     parser.add_argument('--top-k', type=int, default=10)
     parser.add_argument('--content-file', help='Path to content file')
     parser.add_argument('--filters-file', help='Path to filters JSON file')
-    
-    args = parser.parse_args()
-    
+    return parser
+
+
+def run_action(args: argparse.Namespace) -> dict:
+    """Run the action named by parsed arguments and return its result."""
     content = ""
     if args.content_file and os.path.exists(args.content_file):
         with open(args.content_file, 'r') as f:
@@ -408,7 +771,7 @@ def main():
     
     handlers = {
         'index_all': index_all,
-        'add_document': lambda: add_document(args.document_type, args.document_id, content),
+        'add_document': lambda: add_document(args.document_type, args.document_id, content, args.content_file),
         'search': lambda: search_documents(args.search_query, args.document_type if args.document_type != 'custom' else None, args.top_k, filters),
         'get_related': lambda: get_related(args.document_id, args.top_k),
         'update_embeddings': lambda: {"action": "update_embeddings", "message": "Embeddings not implemented (would require ML model)"},
@@ -417,7 +780,17 @@ def main():
         'rebuild_index': rebuild_index
     }
     
-    result = handlers[args.action]()
+    return handlers[args.action]()
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    
+    if args.serve:
+        return serve(parser, run_action)
+    
+    result = run_action(args)
     
     with open('/tmp/knowledge_result.json', 'w') as f:
         json.dump(result, f, indent=2)
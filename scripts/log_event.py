@@ -9,12 +9,16 @@ import string
 import sys
 from datetime import datetime, timezone
 
+from cli_serve import serve
+from session_log import append_event
+
+
+_ID_ALPHABET = string.ascii_lowercase + string.digits
+
 
 def generate_event_id() -> str:
     """Generate a unique event ID."""
-    chars = string.ascii_lowercase + string.digits
-    suffix = ''.join(random.choice(chars) for _ in range(8))
-    return f"e_{suffix}"
+    return 'e_' + ''.join(random.choices(_ID_ALPHABET, k=8))
 
 
 def create_event(
@@ -43,38 +47,34 @@ def create_event(
     return event
 
 
-def load_session(session_id: str) -> dict:
-    """Load a session file."""
-    session_path = f"data/sessions/{session_id}.json"
-    if not os.path.exists(session_path):
-        raise FileNotFoundError(f"Session not found: {session_path}")
-    
-    with open(session_path, 'r') as f:
-        return json.load(f)
-
-
-def save_session(session_id: str, session: dict):
-    """Save a session file."""
-    session_path = f"data/sessions/{session_id}.json"
-    with open(session_path, 'w') as f:
-        json.dump(session, f, indent=2)
-
-
-def main():
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command-line parser, also used for --serve commands."""
     parser = argparse.ArgumentParser(description='Log a game event to a session')
-    parser.add_argument('--session', required=True, help='Session ID')
-    parser.add_argument('--type', required=True, dest='event_type',
+    parser.add_argument('--session', help='Session ID (required unless --serve)')
+    parser.add_argument('--type', dest='event_type',
                        choices=['note', 'check', 'attack', 'damage', 'heal',
                                'gain_item', 'lose_item', 'status', 'create_char',
                                'update_char', 'custom'],
-                       help='Event type')
+                       help='Event type (required unless --serve)')
     parser.add_argument('--actor', default='', help='Actor character ID')
     parser.add_argument('--target', default='', help='Target character ID')
     parser.add_argument('--data-file', help='Path to JSON file containing event data')
     parser.add_argument('--result-file', help='Path to JSON file containing event result')
-    
-    args = parser.parse_args()
-    
+    parser.add_argument('--serve', action='store_true',
+                       help='Log events from JSON commands read line by line from stdin')
+    return parser
+
+
+def parse_args(parser: argparse.ArgumentParser, argv: list = None) -> argparse.Namespace:
+    """Parse arguments, requiring --session and --type outside --serve."""
+    args = parser.parse_args(argv)
+    if not args.serve and not (args.session and args.event_type):
+        parser.error("the following arguments are required: --session, --type")
+    return args
+
+
+def log_from_args(args: argparse.Namespace) -> dict:
+    """Create the event described by parsed arguments and append it."""
     # Load event data and result from files
     data = {}
     result = {}
@@ -91,9 +91,6 @@ def main():
             if content:
                 result = json.loads(content)
     
-    # Load session
-    session = load_session(args.session)
-    
     # Create event
     event = create_event(
         event_type=args.event_type,
@@ -104,10 +101,18 @@ def main():
     )
     
     # Append event to session
-    session['events'].append(event)
+    append_event(args.session, event)
+    return event
+
+
+def main():
+    parser = build_parser()
+    args = parse_args(parser)
+    
+    if args.serve:
+        return serve(parser, log_from_args, parse_args)
     
-    # Save session
-    save_session(args.session, session)
+    event = log_from_args(args)
     
     print(f"Logged event {event['id']} to session {args.session}")
     print(json.dumps(event, indent=2))
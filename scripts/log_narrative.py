@@ -9,34 +9,21 @@ import string
 import sys
 from datetime import datetime, timezone
 
-
-def generate_event_id():
-    """Generate a unique event ID."""
-    chars = string.ascii_lowercase + string.digits
-    suffix = ''.join(random.choice(chars) for _ in range(8))
-    return f"e_{suffix}"
+from cli_serve import serve
+from session_log import append_event
 
 
-def load_session(session_id):
-    """Load a session file."""
-    path = f"data/sessions/{session_id}.json"
-    if os.path.exists(path):
-        with open(path, 'r') as f:
-            return json.load(f)
-    return None
+_ID_ALPHABET = string.ascii_lowercase + string.digits
 
 
-def save_session(session_id, session):
-    """Save a session file."""
-    path = f"data/sessions/{session_id}.json"
-    with open(path, 'w') as f:
-        json.dump(session, f, indent=2)
+def generate_event_id():
+    """Generate a unique event ID."""
+    return 'e_' + ''.join(random.choices(_ID_ALPHABET, k=8))
 
 
 def log_narrative(session_id, narrative_type, text, characters, location, mood):
     """Log a narrative entry to a session."""
-    session = load_session(session_id)
-    if not session:
+    if not os.path.exists(f"data/sessions/{session_id}.json"):
         raise ValueError(f"Session not found: {session_id}")
     
     event_data = {
@@ -59,27 +46,40 @@ def log_narrative(session_id, narrative_type, text, characters, location, mood):
         "data": event_data
     }
     
-    session['events'].append(event)
-    save_session(session_id, session)
+    append_event(session_id, event)
     
     return event
 
 
-def main():
+def build_parser():
+    """Build the command-line parser, also used for --serve commands."""
     parser = argparse.ArgumentParser(description='Log narrative entry')
-    parser.add_argument('--session', required=True, help='Session ID')
-    parser.add_argument('--type', required=True, dest='narrative_type',
+    parser.add_argument('--session', help='Session ID (required unless --serve)')
+    parser.add_argument('--type', dest='narrative_type',
                        choices=['scene_description', 'dialogue', 'action_description',
                                'combat_narration', 'discovery', 'rest_scene',
                                'travel_description', 'npc_interaction', 'plot_point',
-                               'chapter_end'])
+                               'chapter_end'],
+                       help='Narrative type (required unless --serve)')
     parser.add_argument('--text-file', help='Path to file containing narrative text')
     parser.add_argument('--characters', default='', help='Comma-separated character IDs')
     parser.add_argument('--location', default='', help='Current location')
     parser.add_argument('--mood', default='', help='Scene mood/atmosphere')
-    
-    args = parser.parse_args()
-    
+    parser.add_argument('--serve', action='store_true',
+                       help='Log narrative from JSON commands read line by line from stdin')
+    return parser
+
+
+def parse_args(parser, argv=None):
+    """Parse arguments, requiring --session and --type outside --serve."""
+    args = parser.parse_args(argv)
+    if not args.serve and not (args.session and args.narrative_type):
+        parser.error("the following arguments are required: --session, --type")
+    return args
+
+
+def log_from_args(args):
+    """Log the narrative entry described by parsed arguments."""
     # Load narrative text from file
     text = ""
     if args.text_file and os.path.exists(args.text_file):
@@ -88,7 +88,7 @@ def main():
     
     characters = [c.strip() for c in args.characters.split(',') if c.strip()]
     
-    event = log_narrative(
+    return log_narrative(
         args.session,
         args.narrative_type,
         text,
@@ -96,6 +96,16 @@ def main():
         args.location,
         args.mood
     )
+
+
+def main():
+    parser = build_parser()
+    args = parse_args(parser)
+    
+    if args.serve:
+        return serve(parser, log_from_args, parse_args)
+    
+    event = log_from_args(args)
     
     print(f"Logged narrative event: {event['id']}")
     print(json.dumps(event, indent=2))
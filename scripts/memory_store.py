@@ -3,30 +3,67 @@
 
 import argparse
 import hashlib
+import heapq
 import json
 import os
 import sys
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
+from cli_serve import serve
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _loads(data: bytes):
+    """Decode JSON bytes, with orjson when it is installed."""
+    if orjson:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # NaN/Infinity or integers beyond 64 bits, which stdlib json accepts
+    return json.loads(data)
+
+
+_MEMORY_DIRS = (
+    "data/memory",
+    "data/memory/character_knowledge",
+    "data/memory/world_lore",
+    "data/memory/session_history",
+    "data/memory/player_preferences",
+    "data/memory/plot_threads",
+    "data/memory/npc_relationships",
+    "data/memory/item_catalog",
+    "data/memory/rules_clarifications",
+    "data/memory/custom",
+    "data/memory/_index"
+)
+_DIRS_READY = False
+
 
 def ensure_memory_dirs():
-    """Ensure memory directories exist."""
-    dirs = [
-        "data/memory",
-        "data/memory/character_knowledge",
-        "data/memory/world_lore",
-        "data/memory/session_history",
-        "data/memory/player_preferences",
-        "data/memory/plot_threads",
-        "data/memory/npc_relationships",
-        "data/memory/item_catalog",
-        "data/memory/rules_clarifications",
-        "data/memory/custom",
-        "data/memory/_index"
-    ]
-    for d in dirs:
+    """Ensure memory directories exist; only the first call touches the filesystem."""
+    global _DIRS_READY
+    if _DIRS_READY:
+        return
+    for d in _MEMORY_DIRS:
         os.makedirs(d, exist_ok=True)
+    _DIRS_READY = True
+
+
+def _write_json(path: str, data: dict):
+    """Write data as indented JSON atomically.
+    
+    The file is written next to its destination and moved into place, so a
+    crash mid-write never leaves a truncated memory or index file.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(json.dumps(data, indent=2))
+    os.replace(tmp_path, path)
 
 
 def generate_memory_id(content: str) -> str:
@@ -36,18 +73,50 @@ def generate_memory_id(content: str) -> str:
     return f"mem_{timestamp}_{content_hash}"
 
 
+INDEX_PATH = "data/memory/_index/index.json"
+
+# ((mtime_ns, size), parsed index) for INDEX_PATH, reused while the file is unchanged
+_INDEX_CACHE = [None, None]
+
+
+def _invalidate_index_cache():
+    """Drop the cached index, e.g. before it is mutated or rewritten."""
+    _INDEX_CACHE[:] = [None, None]
+
+
 def load_memory_index() -> dict:
-    """Load the memory index."""
-    index_path = "data/memory/_index/index.json"
-    if os.path.exists(index_path):
-        with open(index_path, 'r') as f:
-            return json.load(f)
+    """Load the memory index.
+    
+    The parsed index is cached in-process and returned again while the file
+    is unchanged. Callers that modify it must call _invalidate_index_cache()
+    first, so a failed save never leaves a half-modified cached copy, and
+    then save_memory_index() it.
+    "categories" and "tags" map each name to a {memory_id: 1} dict, used as
+    an ordered set; indexes that stored lists are converted on load.
+    """
+    try:
+        st = os.stat(INDEX_PATH)
+    except FileNotFoundError:
+        st = None
+    if st is not None:
+        key = (st.st_mtime_ns, st.st_size)
+        if _INDEX_CACHE[0] == key:
+            return _INDEX_CACHE[1]
+        with open(INDEX_PATH, 'rb') as f:
+            index = _loads(f.read())
+        for field in ("categories", "tags"):
+            for name, memory_ids in index.get(field, {}).items():
+                if isinstance(memory_ids, list):
+                    index[field][name] = dict.fromkeys(memory_ids, 1)
+        _INDEX_CACHE[:] = [key, index]
+        return index
+    now = datetime.now(timezone.utc).isoformat()
     return {
         "memories": {},
         "categories": {},
         "tags": {},
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "updated_at": datetime.now(timezone.utc).isoformat()
+        "created_at": now,
+        "updated_at": now
     }
 
 
@@ -55,9 +124,9 @@ def save_memory_index(index: dict):
     """Save the memory index."""
     ensure_memory_dirs()
     index["updated_at"] = datetime.now(timezone.utc).isoformat()
-    index_path = "data/memory/_index/index.json"
-    with open(index_path, 'w') as f:
-        json.dump(index, f, indent=2)
+    _write_json(INDEX_PATH, index)
+    st = os.stat(INDEX_PATH)
+    _INDEX_CACHE[:] = [(st.st_mtime_ns, st.st_size), index]
 
 
 def store_memory(category: str, content: dict, tags: list, importance: int) -> dict:
@@ -67,25 +136,26 @@ def store_memory(category: str, content: dict, tags: list, importance: int) -> d
     content_str = json.dumps(content)
     memory_id = generate_memory_id(content_str)
     
+    now = datetime.now(timezone.utc).isoformat()
     memory = {
         "id": memory_id,
         "category": category,
         "content": content,
         "tags": tags,
         "importance": importance,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "created_at": now,
+        "updated_at": now,
         "access_count": 0,
         "last_accessed": None
     }
     
     # Save memory file
     memory_path = f"data/memory/{category}/{memory_id}.json"
-    with open(memory_path, 'w') as f:
-        json.dump(memory, f, indent=2)
+    _write_json(memory_path, memory)
     
     # Update index
     index = load_memory_index()
+    _invalidate_index_cache()
     index["memories"][memory_id] = {
         "category": category,
         "importance": importance,
@@ -94,23 +164,23 @@ def store_memory(category: str, content: dict, tags: list, importance: int) -> d
     }
     
     # Update category index
-    if category not in index["categories"]:
-        index["categories"][category] = []
-    index["categories"][category].append(memory_id)
+    index["categories"].setdefault(category, {})[memory_id] = 1
     
     # Update tag index
     for tag in tags:
-        if tag not in index["tags"]:
-            index["tags"][tag] = []
-        index["tags"][tag].append(memory_id)
+        index["tags"].setdefault(tag, {})[memory_id] = 1
     
     save_memory_index(index)
     
     return {"stored": True, "memory_id": memory_id, "memory": memory}
 
 
-def retrieve_memory(memory_id: str) -> dict:
-    """Retrieve a specific memory by ID."""
+def retrieve_memory(memory_id: str, update_stats: bool = True) -> dict:
+    """Retrieve a specific memory by ID.
+    
+    Unless update_stats is False, the access count and time are bumped,
+    which rewrites the memory file.
+    """
     index = load_memory_index()
     
     if memory_id not in index["memories"]:
@@ -122,51 +192,72 @@ def retrieve_memory(memory_id: str) -> dict:
     if not os.path.exists(memory_path):
         return {"found": False, "error": f"Memory file not found: {memory_path}"}
     
-    with open(memory_path, 'r') as f:
-        memory = json.load(f)
+    with open(memory_path, 'rb') as f:
+        memory = _loads(f.read())
     
     # Update access stats
-    memory["access_count"] += 1
-    memory["last_accessed"] = datetime.now(timezone.utc).isoformat()
-    with open(memory_path, 'w') as f:
-        json.dump(memory, f, indent=2)
+    if update_stats:
+        memory["access_count"] += 1
+        memory["last_accessed"] = datetime.now(timezone.utc).isoformat()
+        _write_json(memory_path, memory)
     
     return {"found": True, "memory": memory}
 
 
+def _candidate_ids(index: dict, category: Optional[str], tags: list) -> set:
+    """Return ids of indexed memories in category that carry any of tags.
+    
+    Either filter is skipped when empty. The smaller filter seeds the
+    candidate set and the larger is only probed, so a selective tag or
+    category never pays for the size of the other.
+    """
+    sources = []
+    if category:
+        sources.append(index["categories"].get(category, {}))
+    
+    # Tags match any
+    if tags:
+        tag_ids = set()
+        for tag in tags:
+            tag_ids.update(index["tags"].get(tag, ()))
+        sources.append(tag_ids)
+    
+    if not sources:
+        return set(index["memories"].keys())
+    
+    sources.sort(key=len)
+    candidate_ids = set(sources[0])
+    for source in sources[1:]:
+        if not candidate_ids:
+            break
+        candidate_ids = {mid for mid in candidate_ids if mid in source}
+    
+    # Tag entries can outlive a memory whose tags were updated before deletion
+    memories = index["memories"]
+    return {mid for mid in candidate_ids if mid in memories}
+
+
 def search_memories(query: str, category: Optional[str], tags: list, limit: int) -> dict:
     """Search memories by content, category, or tags."""
     index = load_memory_index()
     results = []
     
     # Get candidate memory IDs
-    candidate_ids = set(index["memories"].keys())
-    
-    # Filter by category
-    if category:
-        category_ids = set(index["categories"].get(category, []))
-        candidate_ids &= category_ids
-    
-    # Filter by tags (any match)
-    if tags:
-        tag_ids = set()
-        for tag in tags:
-            tag_ids.update(index["tags"].get(tag, []))
-        candidate_ids &= tag_ids
+    candidate_ids = _candidate_ids(index, category, tags)
     
     # Search content
+    needle = query.lower()
     for memory_id in candidate_ids:
         memory_info = index["memories"][memory_id]
         cat = memory_info["category"]
         memory_path = f"data/memory/{cat}/{memory_id}.json"
         
         if os.path.exists(memory_path):
-            with open(memory_path, 'r') as f:
-                memory = json.load(f)
+            with open(memory_path, 'rb') as f:
+                memory = _loads(f.read())
             
-            # Simple text search
-            content_str = json.dumps(memory.get("content", {})).lower()
-            if not query or query.lower() in content_str:
+            # Simple text search; no query matches everything without encoding
+            if not needle or needle in json.dumps(memory.get("content", {})).lower():
                 results.append({
                     "id": memory_id,
                     "category": cat,
@@ -176,9 +267,8 @@ def search_memories(query: str, category: Optional[str], tags: list, limit: int)
                     "created_at": memory.get("created_at")
                 })
     
-    # Sort by importance descending
-    results.sort(key=lambda x: x["importance"], reverse=True)
-    results = results[:limit]
+    # Keep the most important
+    results = heapq.nlargest(limit, results, key=lambda x: x["importance"])
     
     return {"query": query, "count": len(results), "results": results}
 
@@ -196,8 +286,8 @@ def update_memory(memory_id: str, content: dict, tags: list, importance: int) ->
     if not os.path.exists(memory_path):
         return {"updated": False, "error": f"Memory file not found"}
     
-    with open(memory_path, 'r') as f:
-        memory = json.load(f)
+    with open(memory_path, 'rb') as f:
+        memory = _loads(f.read())
     
     # Update fields
     if content:
@@ -208,10 +298,10 @@ def update_memory(memory_id: str, content: dict, tags: list, importance: int) ->
         memory["importance"] = importance
     memory["updated_at"] = datetime.now(timezone.utc).isoformat()
     
-    with open(memory_path, 'w') as f:
-        json.dump(memory, f, indent=2)
+    _write_json(memory_path, memory)
     
     # Update index
+    _invalidate_index_cache()
     index["memories"][memory_id]["importance"] = memory["importance"]
     index["memories"][memory_id]["tags"] = memory["tags"]
     save_memory_index(index)
@@ -219,13 +309,8 @@ def update_memory(memory_id: str, content: dict, tags: list, importance: int) ->
     return {"updated": True, "memory": memory}
 
 
-def delete_memory(memory_id: str) -> dict:
-    """Delete a memory."""
-    index = load_memory_index()
-    
-    if memory_id not in index["memories"]:
-        return {"deleted": False, "error": f"Memory not found: {memory_id}"}
-    
+def _remove_from_index(index: dict, memory_id: str):
+    """Delete a memory's file and drop it from an in-memory index."""
     memory_info = index["memories"][memory_id]
     category = memory_info["category"]
     memory_path = f"data/memory/{category}/{memory_id}.json"
@@ -238,16 +323,22 @@ def delete_memory(memory_id: str) -> dict:
     del index["memories"][memory_id]
     
     if category in index["categories"]:
-        index["categories"][category] = [
-            mid for mid in index["categories"][category] if mid != memory_id
-        ]
+        index["categories"][category].pop(memory_id, None)
     
     for tag in memory_info.get("tags", []):
         if tag in index["tags"]:
-            index["tags"][tag] = [
-                mid for mid in index["tags"][tag] if mid != memory_id
-            ]
+            index["tags"][tag].pop(memory_id, None)
+
+
+def delete_memory(memory_id: str) -> dict:
+    """Delete a memory."""
+    index = load_memory_index()
     
+    if memory_id not in index["memories"]:
+        return {"deleted": False, "error": f"Memory not found: {memory_id}"}
+    
+    _invalidate_index_cache()
+    _remove_from_index(index, memory_id)
     save_memory_index(index)
     
     return {"deleted": True, "memory_id": memory_id}
@@ -272,36 +363,36 @@ def list_categories() -> dict:
     }
 
 
+def _read_memories(indexed: dict, memory_ids, limit: int) -> list:
+    """Read up to limit memory files in order, skipping any that are missing."""
+    memories = []
+    for memory_id in memory_ids:
+        if len(memories) == limit:
+            break
+        memory_path = f"data/memory/{indexed[memory_id]['category']}/{memory_id}.json"
+        try:
+            with open(memory_path, 'rb') as f:
+                memories.append(_loads(f.read()))
+        except FileNotFoundError:
+            continue
+    return memories
+
+
 def get_context(category: Optional[str], tags: list, limit: int) -> dict:
     """Get relevant memories for context building."""
     index = load_memory_index()
-    memories = []
-    
-    candidate_ids = set(index["memories"].keys())
-    
-    if category:
-        candidate_ids &= set(index["categories"].get(category, []))
     
-    if tags:
-        tag_ids = set()
-        for tag in tags:
-            tag_ids.update(index["tags"].get(tag, []))
-        candidate_ids &= tag_ids
+    candidate_ids = _candidate_ids(index, category, tags)
     
-    # Load and sort memories
-    for memory_id in candidate_ids:
-        memory_info = index["memories"][memory_id]
-        cat = memory_info["category"]
-        memory_path = f"data/memory/{cat}/{memory_id}.json"
-        
-        if os.path.exists(memory_path):
-            with open(memory_path, 'r') as f:
-                memory = json.load(f)
-            memories.append(memory)
-    
-    # Sort by importance, then by recency
-    memories.sort(key=lambda x: (x.get("importance", 0), x.get("created_at", "")), reverse=True)
-    memories = memories[:limit]
+    # Rank by importance, then by recency, using the copies kept in the index
+    # so only the memories that make the cut are read from disk
+    indexed = index["memories"]
+    rank = lambda mid: (indexed[mid].get("importance", 0), indexed[mid].get("created_at", ""))
+    ranked = heapq.nlargest(limit, candidate_ids, key=rank)
+    memories = _read_memories(indexed, ranked, limit)
+    if len(memories) < len(ranked):
+        # Some files were missing, so rank every candidate to fill the gap
+        memories = _read_memories(indexed, sorted(candidate_ids, key=rank, reverse=True), limit)
     
     # Format for context
     context_items = []
@@ -319,39 +410,45 @@ def get_context(category: Optional[str], tags: list, limit: int) -> dict:
 def prune_memories(max_age_days: int = 90, min_importance: int = 3) -> dict:
     """Prune old, low-importance memories."""
     index = load_memory_index()
-    pruned = []
     
-    cutoff_date = datetime.now(timezone.utc)
+    # Older than max_age_days whole days, i.e. at least one more day old
+    cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days + 1)
     
-    for memory_id, memory_info in list(index["memories"].items()):
+    pruned = []
+    for memory_id, memory_info in index["memories"].items():
         # Skip high importance memories
         if memory_info.get("importance", 5) >= min_importance:
             continue
         
-        category = memory_info["category"]
-        memory_path = f"data/memory/{category}/{memory_id}.json"
+        memory_path = f"data/memory/{memory_info['category']}/{memory_id}.json"
+        try:
+            with open(memory_path, 'rb') as f:
+                memory = _loads(f.read())
+        except FileNotFoundError:
+            continue
         
-        if os.path.exists(memory_path):
-            with open(memory_path, 'r') as f:
-                memory = json.load(f)
-            
-            created_str = memory.get("created_at", "")
-            if created_str:
-                created = datetime.fromisoformat(created_str.replace('Z', '+00:00'))
-                age_days = (cutoff_date - created).days
-                
-                if age_days > max_age_days:
-                    delete_memory(memory_id)
-                    pruned.append(memory_id)
+        created_str = memory.get("created_at", "")
+        if created_str and datetime.fromisoformat(created_str.replace('Z', '+00:00')) <= cutoff:
+            pruned.append(memory_id)
+    
+    if pruned:
+        _invalidate_index_cache()
+        for memory_id in pruned:
+            _remove_from_index(index, memory_id)
+        save_memory_index(index)
     
     return {"pruned": len(pruned), "memory_ids": pruned}
 
 
-def main():
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command-line parser, also used for --serve commands."""
     parser = argparse.ArgumentParser(description='Memory store operations')
-    parser.add_argument('--operation', required=True,
-                       choices=['store', 'retrieve', 'search', 'update', 'delete',
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--operation',
+                      choices=['store', 'retrieve', 'search', 'update', 'delete',
                                'list_categories', 'get_context', 'prune'])
+    mode.add_argument('--serve', action='store_true',
+                      help='Answer JSON commands read line by line from stdin')
     parser.add_argument('--memory-id', default='')
     parser.add_argument('--category', default='custom')
     parser.add_argument('--tags', default='')
@@ -359,22 +456,27 @@ def main():
     parser.add_argument('--importance', type=int, default=5)
     parser.add_argument('--context-limit', type=int, default=20)
     parser.add_argument('--content-file', help='Path to content JSON file')
-    
-    args = parser.parse_args()
-    
+    parser.add_argument('--no-access-stats', action='store_true',
+                       help='Retrieve without updating the access count, leaving the file untouched')
+    return parser
+
+
+def run_operation(args: argparse.Namespace) -> dict:
+    """Run the operation named by parsed arguments and return its result."""
     tags = [t.strip() for t in args.tags.split(',') if t.strip()]
     
     content = {}
     if args.content_file and os.path.exists(args.content_file):
         with open(args.content_file, 'r') as f:
-            try:
-                content = json.load(f)
-            except json.JSONDecodeError:
-                content = {"text": f.read()}
+            raw = f.read()
+        try:
+            content = json.loads(raw)
+        except json.JSONDecodeError:
+            content = {"text": raw}
     
     handlers = {
         'store': lambda: store_memory(args.category, content, tags, args.importance),
-        'retrieve': lambda: retrieve_memory(args.memory_id),
+        'retrieve': lambda: retrieve_memory(args.memory_id, not args.no_access_stats),
         'search': lambda: search_memories(args.search_query, args.category if args.category != 'custom' else None, tags, args.context_limit),
         'update': lambda: update_memory(args.memory_id, content, tags, args.importance),
         'delete': lambda: delete_memory(args.memory_id),
@@ -383,12 +485,23 @@ def main():
         'prune': lambda: prune_memories()
     }
     
-    result = handlers[args.operation]()
+    return handlers[args.operation]()
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    
+    if args.serve:
+        return serve(parser, run_operation)
+    
+    result = run_operation(args)
     
+    output = json.dumps(result, indent=2)
     with open('/tmp/memory_result.json', 'w') as f:
-        json.dump(result, f, indent=2)
+        f.write(output)
     
-    print(json.dumps(result, indent=2))
+    print(output)
     return 0
 
 
@@ -2,12 +2,21 @@
 """Prompt engineering engine for complex LLM interactions."""
 
 import argparse
+import functools
 import json
 import os
+import re
 import sys
 from datetime import datetime, timezone
 from typing import Optional
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_loads = orjson.loads if orjson else json.loads
+
 
 def ensure_prompt_dirs():
     """Ensure prompt directories exist."""
@@ -288,6 +297,18 @@ Provide:
 }
 
 
+def _write_json(path: str, data: dict):
+    """Write data as indented JSON atomically.
+    
+    The file is written next to its destination and moved into place, so a
+    crash mid-write never leaves a truncated template or chain.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(json.dumps(data, indent=2))
+    os.replace(tmp_path, path)
+
+
 def load_template(template_id: str) -> Optional[dict]:
     """Load a prompt template by ID."""
     # Check built-in templates first
@@ -297,8 +318,8 @@ def load_template(template_id: str) -> Optional[dict]:
     # Check custom templates
     template_path = f"data/prompts/templates/{template_id}.json"
     if os.path.exists(template_path):
-        with open(template_path, 'r') as f:
-            return json.load(f)
+        with open(template_path, 'rb') as f:
+            return _loads(f.read())
     
     return None
 
@@ -311,8 +332,7 @@ def save_template(template: dict) -> str:
     template["created_at"] = datetime.now(timezone.utc).isoformat()
     
     template_path = f"data/prompts/templates/{template_id}.json"
-    with open(template_path, 'w') as f:
-        json.dump(template, f, indent=2)
+    _write_json(template_path, template)
     
     return template_id
 
@@ -333,10 +353,11 @@ def list_templates() -> dict:
     # Custom templates
     templates_dir = "data/prompts/templates"
     if os.path.exists(templates_dir):
-        for filename in os.listdir(templates_dir):
-            if filename.endswith('.json'):
-                with open(os.path.join(templates_dir, filename), 'r') as f:
-                    template = json.load(f)
+        with os.scandir(templates_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.json'):
+                    with open(entry.path, 'rb') as f:
+                        template = _loads(f.read())
                     templates.append({
                         "id": template.get("id"),
                         "name": template.get("name"),
@@ -347,22 +368,47 @@ def list_templates() -> dict:
     return {"count": len(templates), "templates": templates}
 
 
+_PLACEHOLDER_RE = re.compile(r'\{\{([^{}]*)\}\}')
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_template(user_template: str) -> tuple:
+    """Split a user template into alternating literal text and {{placeholder}} names.
+    
+    Cached by template text, so built-in and custom templates are parsed
+    once per process and an edited custom template is parsed again.
+    """
+    return tuple(_PLACEHOLDER_RE.split(user_template))
+
+
 def render_template(template: dict, variables: dict) -> dict:
     """Render a template with provided variables."""
     system_prompt = template.get("system_prompt", "")
     user_template = template.get("user_template", "")
     
-    # Simple variable substitution
-    rendered_user = user_template
-    for var, value in variables.items():
-        placeholder = "{{" + var + "}}"
-        rendered_user = rendered_user.replace(placeholder, str(value) if value else "[not provided]")
+    # Fill every placeholder in one pass; unknown ones are left as written
+    parts = list(_compile_template(user_template))
+    # Text before the first placeholder is identical on every render, so
+    # system prompt + this prefix can be marked for provider prompt caching
+    static_prefix_chars = len(parts[0])
+    missing = {}
+    for i in range(1, len(parts), 2):
+        var = parts[i]
+        if var in variables:
+            value = variables[var]
+            parts[i] = str(value) if value else "[not provided]"
+        else:
+            missing[var] = None
+            parts[i] = "{{" + var + "}}"
+    rendered_user = "".join(parts)
     
     return {
         "system_prompt": system_prompt,
         "user_prompt": rendered_user,
+        "static_prefix_chars": static_prefix_chars,
         "template_id": template.get("id"),
-        "variables_used": list(variables.keys())
+        "variables_used": list(variables.keys()),
+        "missing_variables": list(missing)
     }
 
 
@@ -380,9 +426,14 @@ def generate_prompt(template_id: str, variables: dict, include_context: bool, mo
         "template_name": template.get("name"),
         "system_prompt": rendered["system_prompt"],
         "user_prompt": rendered["user_prompt"],
+        "static_prefix_chars": rendered["static_prefix_chars"],
         "generated_at": datetime.now(timezone.utc).isoformat()
     }
     
+    # Flag placeholders left unfilled
+    if rendered["missing_variables"]:
+        result["missing_variables"] = rendered["missing_variables"]
+    
     # Add model hints
     if model_hints:
         result["model_hints"] = model_hints
@@ -390,8 +441,17 @@ def generate_prompt(template_id: str, variables: dict, include_context: bool, mo
     # Add context if requested
     if include_context:
         # Import context engine functionality
-        from context_engine import build_full_game_state
-        context = build_full_game_state(2000, True, 10)
+        from context_engine import (build_full_game_state, context_cache_path,
+                                    read_cached_context, write_cached_context)
+        # Share the context engine's disk cache with `build_context` for the
+        # same parameters; the key covers the data, so edits rebuild it
+        cache_path = context_cache_path('build_context', 'full_game_state', (), 2000, True, 10)
+        cached = read_cached_context(cache_path)
+        if cached is not None:
+            context = _loads(cached)
+        else:
+            context = build_full_game_state(2000, True, 10)
+            write_cached_context(cache_path, json.dumps(context, indent=2))
         result["context"] = context
     
     return result
@@ -434,8 +494,7 @@ def compose_chain(chain_id: str, templates: list, variables: dict) -> dict:
     
     # Save chain
     chain_path = f"data/prompts/chains/{chain_id}.json"
-    with open(chain_path, 'w') as f:
-        json.dump(chain, f, indent=2)
+    _write_json(chain_path, chain)
     
     return {"composed": True, "chain": chain}
 
@@ -450,6 +509,8 @@ def main():
     parser.add_argument('--include-context', default='true')
     parser.add_argument('--variables-file', help='Path to variables JSON file')
     parser.add_argument('--model-hints-file', help='Path to model hints JSON file')
+    parser.add_argument('--compact', action='store_true',
+                       help='Print compact JSON instead of indented output')
     
     args = parser.parse_args()
     
@@ -487,7 +548,7 @@ def main():
     with open('/tmp/prompt_result.json', 'w') as f:
         json.dump(result, f, indent=2)
     
-    print(json.dumps(result, indent=2))
+    print(json.dumps(result, separators=(',', ':')) if args.compact else json.dumps(result, indent=2))
     return 0
 
 
@@ -2,38 +2,64 @@
 """Query game data with various filters and options."""
 
 import argparse
+import heapq
 import json
 import os
 import sys
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_loads = orjson.loads if orjson else json.loads
+
+
+# Directory path -> (fingerprint, {id: parsed file}) for _load_dir
+_DIR_CACHE = {}
+
+
+def _load_dir(path):
+    """Load every JSON file in a directory that has an id, keyed by that id.
+    
+    Results are cached in-process and reused while no file in the directory
+    has been added, removed or changed (by name, mtime and size), so
+    callers must not modify them.
+    """
+    try:
+        with os.scandir(path) as it:
+            entries = [entry for entry in it if entry.name.endswith('.json')]
+    except FileNotFoundError:
+        return {}
+    
+    fingerprint = []
+    for entry in entries:
+        st = entry.stat()
+        fingerprint.append((entry.name, st.st_mtime_ns, st.st_size))
+    fingerprint = tuple(fingerprint)
+    cached = _DIR_CACHE.get(path)
+    if cached and cached[0] == fingerprint:
+        return cached[1]
+    
+    loaded = {}
+    for entry in entries:
+        with open(entry.path, 'rb') as f:
+            data = _loads(f.read())
+        if 'id' in data:
+            loaded[data['id']] = data
+    _DIR_CACHE[path] = (fingerprint, loaded)
+    return loaded
+
 
 def load_all_characters():
     """Load all character files."""
-    characters = {}
-    chars_dir = "data/characters"
-    if os.path.exists(chars_dir):
-        for filename in os.listdir(chars_dir):
-            if filename.endswith('.json'):
-                with open(os.path.join(chars_dir, filename), 'r') as f:
-                    char = json.load(f)
-                    if 'id' in char:
-                        characters[char['id']] = char
-    return characters
+    return _load_dir("data/characters")
 
 
 def load_all_sessions():
     """Load all session files."""
-    sessions = {}
-    sessions_dir = "data/sessions"
-    if os.path.exists(sessions_dir):
-        for filename in os.listdir(sessions_dir):
-            if filename.endswith('.json'):
-                with open(os.path.join(sessions_dir, filename), 'r') as f:
-                    sess = json.load(f)
-                    if 'id' in sess:
-                        sessions[sess['id']] = sess
-    return sessions
+    return _load_dir("data/sessions")
 
 
 def load_world_data():
@@ -44,13 +70,7 @@ def load_world_data():
         for subdir in ['locations', 'items', 'quests', 'factions']:
             subpath = os.path.join(world_dir, subdir)
             if os.path.exists(subpath):
-                world[subdir] = {}
-                for filename in os.listdir(subpath):
-                    if filename.endswith('.json'):
-                        with open(os.path.join(subpath, filename), 'r') as f:
-                            data = json.load(f)
-                            if 'id' in data:
-                                world[subdir][data['id']] = data
+                world[subdir] = _load_dir(subpath)
     return world
 
 
@@ -86,22 +106,41 @@ def query_session_by_id(resource_id):
     return {"found": False, "error": f"Session '{resource_id}' not found"}
 
 
+# [characters dict, {tag: {character id: 1}}] for the last characters load
+_TAG_INDEX = [None, None]
+
+
+def _character_tag_index(chars):
+    """Map each tag to the ids of the characters carrying it, in load order.
+    
+    The index is rebuilt only when load_all_characters() returns a new
+    dict, i.e. when the character files changed.
+    """
+    if _TAG_INDEX[0] is not chars:
+        index = {}
+        for cid, char in chars.items():
+            for tag in char.get('tags', []):
+                index.setdefault(tag, {})[cid] = 1
+        _TAG_INDEX[:] = [chars, index]
+    return _TAG_INDEX[1]
+
+
 def query_characters_by_tag(filter_value, limit):
     """Get characters with a specific tag."""
     chars = load_all_characters()
-    result = [c for c in chars.values() if filter_value in c.get('tags', [])][:limit]
+    tagged = _character_tag_index(chars).get(filter_value, {})
+    result = [chars[cid] for cid in tagged][:limit]
     return {"count": len(result), "tag": filter_value, "characters": result}
 
 
 def query_game_state(resource_id):
     """Get computed game state for a session."""
-    from get_game_state import load_all_characters, load_session, reduce, generate_summary
+    from get_game_state import load_all_characters, iter_events, replay, generate_summary
     
     state = {"characters": load_all_characters()}
     if resource_id:
-        session = load_session(resource_id)
-        for event in session.get("events", []):
-            state = reduce(state, event)
+        # replay() batches long damage/heal runs through the HP array kernel
+        replay(state, iter_events(resource_id))
     
     return generate_summary(state)
 
@@ -109,21 +148,53 @@ def query_game_state(resource_id):
 def query_recent_events(limit):
     """Get recent events across all sessions."""
     sessions = load_all_sessions()
-    all_events = []
     
+    # Decorate with (ts, -position) so ties keep their original order and
+    # the comparison stays on plain tuples rather than a Python key callable.
+    keyed = []
     for sess_id, sess in sessions.items():
         for event in sess.get('events', []):
-            event_copy = event.copy()
-            event_copy['session_id'] = sess_id
-            all_events.append(event_copy)
+            keyed.append((event.get('ts', ''), -len(keyed), sess_id, event))
     
-    # Sort by timestamp descending
-    all_events.sort(key=lambda e: e.get('ts', ''), reverse=True)
-    result = all_events[:limit]
+    # Copy only the events that make the cut
+    result = []
+    for _, _, sess_id, event in heapq.nlargest(limit, keyed):
+        event_copy = event.copy()
+        event_copy['session_id'] = sess_id
+        result.append(event_copy)
     
     return {"count": len(result), "events": result}
 
 
+# Corpus name -> [loaded dict, lowercased search text built from it]
+_SEARCH_TEXT = {}
+
+
+def _search_text(name, loaded, build):
+    """Return build(loaded), rebuilt only when the loader returned a new dict."""
+    cached = _SEARCH_TEXT.get(name)
+    if cached is None or cached[0] is not loaded:
+        cached = _SEARCH_TEXT[name] = [loaded, build(loaded)]
+    return cached[1]
+
+
+def _character_search_text(chars):
+    """Pair each character with its lowercased name, notes and class."""
+    return [
+        (char, char.get('name', '').lower(), char.get('notes', '').lower(), char.get('class', '').lower())
+        for char in chars.values()
+    ]
+
+
+def _session_search_text(sessions):
+    """Pair each session with its lowercased campaign and each event with its lowercased data JSON."""
+    return [
+        (sess, sess.get('campaign', '').lower(),
+         [(event, json.dumps(event.get('data', {})).lower()) for event in sess.get('events', [])])
+        for sess in sessions.values()
+    ]
+
+
 def query_search(filter_value, limit):
     """Search across all data."""
     results = {
@@ -137,64 +208,98 @@ def query_search(filter_value, limit):
     
     # Search characters
     chars = load_all_characters()
-    for char in chars.values():
-        if (search_term in char.get('name', '').lower() or
-            search_term in char.get('notes', '').lower() or
-            search_term in char.get('class', '').lower()):
+    for char, name, notes, char_class in _search_text('characters', chars, _character_search_text):
+        if search_term in name or search_term in notes or search_term in char_class:
             results['characters'].append(char)
     
     # Search sessions
     sessions = load_all_sessions()
-    for sess in sessions.values():
-        if search_term in sess.get('campaign', '').lower():
+    matched_events = []
+    for sess, campaign, events in _search_text('sessions', sessions, _session_search_text):
+        if search_term in campaign:
             results['sessions'].append(sess)
         
         # Search events
-        for event in sess.get('events', []):
-            data_str = json.dumps(event.get('data', {})).lower()
+        for event, data_str in events:
             if search_term in data_str:
-                event_copy = event.copy()
-                event_copy['session_id'] = sess['id']
-                results['events'].append(event_copy)
+                matched_events.append((event, sess['id']))
     
-    # Apply limits
+    # Apply limits, copying only the events that are returned
     results['characters'] = results['characters'][:limit]
     results['sessions'] = results['sessions'][:limit]
-    results['events'] = results['events'][:limit]
+    results['events'] = [{**event, 'session_id': sess_id} for event, sess_id in matched_events[:limit]]
+    
+    return results
+
+
+QUERY_TYPES = ['all_characters', 'all_sessions', 'character_by_id', 'session_by_id',
+               'characters_by_tag', 'game_state', 'recent_events', 'search']
+
+
+def run_query(query_type, resource_id='', filter_value='', limit=50):
+    """Run one query by type and return its result."""
+    handlers = {
+        'all_characters': lambda: query_all_characters(limit),
+        'all_sessions': lambda: query_all_sessions(limit),
+        'character_by_id': lambda: query_character_by_id(resource_id),
+        'session_by_id': lambda: query_session_by_id(resource_id),
+        'characters_by_tag': lambda: query_characters_by_tag(filter_value, limit),
+        'game_state': lambda: query_game_state(resource_id),
+        'recent_events': lambda: query_recent_events(limit),
+        'search': lambda: query_search(filter_value, limit)
+    }
     
+    return handlers[query_type]()
+
+
+def run_batch(specs):
+    """Run a list of query specs in order and return their results.
+    
+    Each spec is {"query_type": ..., "resource_id": ..., "filter": ...,
+    "limit": ...} with the CLI defaults for missing keys. Data files are
+    parsed once and reused across the batch; a bad spec yields an
+    {"error": ...} entry instead of stopping the batch.
+    """
+    results = []
+    for spec in specs:
+        if not isinstance(spec, dict) or spec.get('query_type') not in QUERY_TYPES:
+            results.append({"error": f"Invalid query spec: {spec!r}"})
+            continue
+        try:
+            results.append(run_query(spec['query_type'], spec.get('resource_id', ''),
+                                     spec.get('filter', ''), int(spec.get('limit', 50))))
+        except (ValueError, OSError) as e:
+            results.append({"error": str(e)})
     return results
 
 
 def main():
     parser = argparse.ArgumentParser(description='Query game data')
-    parser.add_argument('--query-type', required=True,
-                       choices=['all_characters', 'all_sessions', 'character_by_id',
-                               'session_by_id', 'characters_by_tag', 'game_state',
-                               'recent_events', 'search'])
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--query-type', choices=QUERY_TYPES)
+    mode.add_argument('--batch', help='Path to a JSON list of query specs to run in one process')
     parser.add_argument('--resource-id', default='')
     parser.add_argument('--filter', default='')
     parser.add_argument('--limit', type=int, default=50)
     parser.add_argument('--output-file', default='/tmp/query_result.json')
+    parser.add_argument('--compact', action='store_true',
+                       help='Print compact JSON instead of indented output')
     
     args = parser.parse_args()
     
-    handlers = {
-        'all_characters': lambda: query_all_characters(args.limit),
-        'all_sessions': lambda: query_all_sessions(args.limit),
-        'character_by_id': lambda: query_character_by_id(args.resource_id),
-        'session_by_id': lambda: query_session_by_id(args.resource_id),
-        'characters_by_tag': lambda: query_characters_by_tag(args.filter, args.limit),
-        'game_state': lambda: query_game_state(args.resource_id),
-        'recent_events': lambda: query_recent_events(args.limit),
-        'search': lambda: query_search(args.filter, args.limit)
-    }
-    
-    result = handlers[args.query_type]()
+    if args.batch:
+        with open(args.batch, 'rb') as f:
+            specs = _loads(f.read())
+        if not isinstance(specs, list):
+            parser.error("--batch file must hold a JSON list of query specs")
+        result = run_batch(specs)
+    else:
+        result = run_query(args.query_type, args.resource_id, args.filter, args.limit)
     
     with open(args.output_file, 'w') as f:
         json.dump(result, f, indent=2)
     
-    print(json.dumps(result, indent=2))
+    print(json.dumps(result, separators=(',', ':')) if args.compact else json.dumps(result, indent=2))
     return 0
 
 
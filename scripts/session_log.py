@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Write events into session files; shared by the gameplay and logging scripts."""
+
+import json
+import os
+
+
+def save_session(session_id: str, session: dict):
+    """Save a session file atomically.
+
+    The session is written to a temporary file next to it and moved into
+    place, so a crash mid-write never leaves a truncated campaign log.
+    """
+    session_path = f"data/sessions/{session_id}.json"
+    tmp_path = session_path + '.tmp'
+    with open(tmp_path, 'w', buffering=65536) as f:
+        json.dump(session, f, indent=2)
+    os.replace(tmp_path, session_path)
+
+
+# Trailing bytes of an indent=2 session file whose events array is the
+# last key: either an empty array or one closed after an event object.
+_EMPTY_EVENTS_TAIL = b'"events": []\n}'
+_EVENTS_TAIL = b'\n    }\n  ]\n}'
+
+
+def append_event(session_id: str, event: dict):
+    """Append an event to a session without re-encoding its history.
+
+    Session files are json.dump(indent=2) output with "events" as the last
+    key, so the new event, encoded the same way, is spliced in just before
+    the closing "]" of that array and the result matches what save_session
+    would write. The spliced file replaces the session through a temporary
+    file like save_session does. Files in any other layout are loaded and
+    saved whole.
+    """
+    session_path = f"data/sessions/{session_id}.json"
+    if not os.path.exists(session_path):
+        raise FileNotFoundError(f"Session not found: {session_path}")
+
+    with open(session_path, 'rb') as f:
+        data = f.read()
+    encoded = json.dumps(event, indent=2).encode().replace(b'\n', b'\n    ')
+    if data.endswith(_EVENTS_TAIL):
+        data = data[:-len(b'\n  ]\n}')] + b',\n    ' + encoded + b'\n  ]\n}'
+    elif data.endswith(_EMPTY_EVENTS_TAIL):
+        data = data[:-len(b']\n}')] + b'\n    ' + encoded + b'\n  ]\n}'
+    else:
+        session = json.loads(data)
+        session['events'].append(event)
+        save_session(session_id, session)
+        return
+
+    tmp_path = session_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, session_path)
@@ -6,25 +6,38 @@ import json
 import os
 import sys
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-ALLOWED_FIELDS = {'id', 'name', 'class', 'lvl', 'stats', 'hp', 'inventory', 'tags', 'notes'}
+_loads = orjson.loads if orjson else json.loads
+
+
+ALLOWED_FIELDS = frozenset({'id', 'name', 'class', 'lvl', 'stats', 'hp', 'inventory', 'tags', 'notes'})
 
 
 def load_character(char_id: str) -> dict:
     """Load a character file."""
     char_path = f"data/characters/{char_id}.json"
-    if not os.path.exists(char_path):
-        raise FileNotFoundError(f"Character not found: {char_path}")
-    
-    with open(char_path, 'r') as f:
-        return json.load(f)
+    try:
+        with open(char_path, 'rb') as f:
+            return _loads(f.read())
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Character not found: {char_path}") from None
 
 
 def save_character(char_id: str, character: dict):
-    """Save a character file."""
+    """Save a character file atomically.
+    
+    The character is written to a temporary file next to it and moved into
+    place, so a reader never sees a half-written character.
+    """
     char_path = f"data/characters/{char_id}.json"
-    with open(char_path, 'w') as f:
+    tmp_path = char_path + '.tmp'
+    with open(tmp_path, 'w') as f:
         json.dump(character, f, indent=2)
+    os.replace(tmp_path, char_path)
 
 
 def apply_patch(character: dict, patch: dict) -> dict:
@@ -57,8 +70,8 @@ def main():
     args = parser.parse_args()
     
     # Load patch from file
-    with open(args.patch_file, 'r') as f:
-        patch = json.load(f)
+    with open(args.patch_file, 'rb') as f:
+        patch = _loads(f.read())
     
     # Load character
     character = load_character(args.id)
@@ -0,0 +1,57 @@
+"""Weighted random selection with Vose's alias method.
+
+Building a table is O(n); each sample afterwards is O(1) (one index draw
+and one coin flip), so repeated rolls on the same loot or encounter table
+never rescan the weights.
+"""
+
+import random
+
+_TABLES = {}
+
+
+class AliasTable:
+    """Alias table over outcome indexes 0..n-1, weighted by `weights`."""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0 or any(w < 0 for w in weights):
+            raise ValueError("Weights must be non-negative with a positive sum")
+        
+        scaled = [w * n / total for w in weights]
+        self.prob = [0.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        
+        # Whatever is left is 1.0 up to rounding error
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def sample(self, rng=random) -> int:
+        """Draw one outcome index."""
+        i = rng.randrange(len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+def alias_table(weights) -> AliasTable:
+    """Return a cached AliasTable for these weights, building it on first use."""
+    key = tuple(weights)
+    table = _TABLES.get(key)
+    if table is None:
+        table = _TABLES[key] = AliasTable(key)
+    return table
+
+
+def weighted_choice(outcomes: list, weights, rng=random):
+    """Pick one of outcomes according to weights."""
+    return outcomes[alias_table(weights).sample(rng)]
@@ -7,174 +7,143 @@ import os
 import sys
 from datetime import datetime, timezone
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_loads = orjson.loads if orjson else json.loads
+
+
+# Entity type -> subdirectory of data/world; other types use "<type>s"
+_TYPE_TO_DIR = {
+    'location': 'locations',
+    'item': 'items',
+    'quest': 'quests',
+    'faction': 'factions',
+    'npc': 'npcs'
+}
+
+
+_WORLD_DIRS = (
+    "data/world",
+    "data/world/locations",
+    "data/world/items",
+    "data/world/quests",
+    "data/world/factions",
+    "data/world/npcs"
+)
+_DIRS_READY = False
+
 
 def ensure_world_dirs():
-    """Ensure world data directories exist."""
-    dirs = [
-        "data/world",
-        "data/world/locations",
-        "data/world/items",
-        "data/world/quests",
-        "data/world/factions",
-        "data/world/npcs"
-    ]
-    for d in dirs:
+    """Ensure world data directories exist; only the first call touches the filesystem."""
+    global _DIRS_READY
+    if _DIRS_READY:
+        return
+    for d in _WORLD_DIRS:
         os.makedirs(d, exist_ok=True)
+    _DIRS_READY = True
 
 
 def save_entity(entity_type, entity_id, data):
-    """Save a world entity to file."""
-    ensure_world_dirs()
+    """Save a world entity to file atomically.
     
-    type_to_dir = {
-        'location': 'locations',
-        'item': 'items',
-        'quest': 'quests',
-        'faction': 'factions',
-        'npc': 'npcs'
-    }
+    The entity is written to a temporary file next to it and moved into
+    place, so a reader never sees a half-written entity.
+    """
+    ensure_world_dirs()
     
-    subdir = type_to_dir.get(entity_type, entity_type + 's')
+    subdir = _TYPE_TO_DIR.get(entity_type, entity_type + 's')
     path = f"data/world/{subdir}/{entity_id}.json"
     
-    with open(path, 'w') as f:
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
         json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
     
     return path
 
 
 def load_entity(entity_type, entity_id):
     """Load a world entity from file."""
-    type_to_dir = {
-        'location': 'locations',
-        'item': 'items',
-        'quest': 'quests',
-        'faction': 'factions',
-        'npc': 'npcs'
-    }
-    
-    subdir = type_to_dir.get(entity_type, entity_type + 's')
+    subdir = _TYPE_TO_DIR.get(entity_type, entity_type + 's')
     path = f"data/world/{subdir}/{entity_id}.json"
     
     if os.path.exists(path):
-        with open(path, 'r') as f:
-            return json.load(f)
+        with open(path, 'rb') as f:
+            return _loads(f.read())
     return None
 
 
+# Entity type -> (field, default) pairs stored between "name" and
+# "created_at", in file order; a callable default (list) makes a fresh value
+_ENTITY_FIELDS = {
+    'location': (
+        ('description', ''), ('region', ''), ('terrain', 'unknown'),
+        ('notable_features', list), ('connections', list), ('npcs_present', list),
+        ('encounters', list), ('loot', list), ('notes', '')
+    ),
+    'npc': (
+        ('role', 'commoner'), ('description', ''), ('personality', ''), ('location', ''),
+        ('faction', ''), ('attitude', 'neutral'), ('services', list), ('inventory', list),
+        ('dialogue_hooks', list), ('secrets', list), ('notes', '')
+    ),
+    'item': (
+        ('item_type', 'miscellaneous'), ('rarity', 'common'), ('description', ''),
+        ('properties', list), ('value', 0), ('weight', 0), ('attunement', False),
+        ('effects', list), ('notes', '')
+    ),
+    'quest': (
+        ('quest_type', 'main'), ('status', 'available'), ('giver', ''), ('description', ''),
+        ('objectives', list), ('rewards', list), ('prerequisites', list), ('location', ''),
+        ('difficulty', 'medium'), ('notes', '')
+    ),
+    'faction': (
+        ('description', ''), ('alignment', 'neutral'), ('leader', ''), ('headquarters', ''),
+        ('goals', list), ('allies', list), ('enemies', list), ('members', list),
+        ('resources', list), ('reputation', 0), ('notes', '')
+    )
+}
+
+
+def create_entity(entity_type, entity_id, data):
+    """Create and save a new entity of a type listed in _ENTITY_FIELDS."""
+    entity = {"id": entity_id, "type": entity_type, "name": data.get('name', entity_id)}
+    for field, default in _ENTITY_FIELDS[entity_type]:
+        if field in data:
+            entity[field] = data[field]
+        else:
+            entity[field] = default() if callable(default) else default
+    entity["created_at"] = datetime.now(timezone.utc).isoformat()
+    
+    path = save_entity(entity_type, entity_id, entity)
+    return {"created": True, "path": path, "entity": entity}
+
+
 def create_location(entity_id, data):
     """Create a new location."""
-    location = {
-        "id": entity_id,
-        "type": "location",
-        "name": data.get('name', entity_id),
-        "description": data.get('description', ''),
-        "region": data.get('region', ''),
-        "terrain": data.get('terrain', 'unknown'),
-        "notable_features": data.get('notable_features', []),
-        "connections": data.get('connections', []),
-        "npcs_present": data.get('npcs_present', []),
-        "encounters": data.get('encounters', []),
-        "loot": data.get('loot', []),
-        "notes": data.get('notes', ''),
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
-    
-    path = save_entity('location', entity_id, location)
-    return {"created": True, "path": path, "entity": location}
+    return create_entity('location', entity_id, data)
 
 
 def create_npc(entity_id, data):
     """Create a new NPC."""
-    npc = {
-        "id": entity_id,
-        "type": "npc",
-        "name": data.get('name', entity_id),
-        "role": data.get('role', 'commoner'),
-        "description": data.get('description', ''),
-        "personality": data.get('personality', ''),
-        "location": data.get('location', ''),
-        "faction": data.get('faction', ''),
-        "attitude": data.get('attitude', 'neutral'),
-        "services": data.get('services', []),
-        "inventory": data.get('inventory', []),
-        "dialogue_hooks": data.get('dialogue_hooks', []),
-        "secrets": data.get('secrets', []),
-        "notes": data.get('notes', ''),
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
-    
-    path = save_entity('npc', entity_id, npc)
-    return {"created": True, "path": path, "entity": npc}
+    return create_entity('npc', entity_id, data)
 
 
 def create_item(entity_id, data):
     """Create a new item."""
-    item = {
-        "id": entity_id,
-        "type": "item",
-        "name": data.get('name', entity_id),
-        "item_type": data.get('item_type', 'miscellaneous'),
-        "rarity": data.get('rarity', 'common'),
-        "description": data.get('description', ''),
-        "properties": data.get('properties', []),
-        "value": data.get('value', 0),
-        "weight": data.get('weight', 0),
-        "attunement": data.get('attunement', False),
-        "effects": data.get('effects', []),
-        "notes": data.get('notes', ''),
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
-    
-    path = save_entity('item', entity_id, item)
-    return {"created": True, "path": path, "entity": item}
+    return create_entity('item', entity_id, data)
 
 
 def create_quest(entity_id, data):
     """Create a new quest."""
-    quest = {
-        "id": entity_id,
-        "type": "quest",
-        "name": data.get('name', entity_id),
-        "quest_type": data.get('quest_type', 'main'),
-        "status": data.get('status', 'available'),
-        "giver": data.get('giver', ''),
-        "description": data.get('description', ''),
-        "objectives": data.get('objectives', []),
-        "rewards": data.get('rewards', []),
-        "prerequisites": data.get('prerequisites', []),
-        "location": data.get('location', ''),
-        "difficulty": data.get('difficulty', 'medium'),
-        "notes": data.get('notes', ''),
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
-    
-    path = save_entity('quest', entity_id, quest)
-    return {"created": True, "path": path, "entity": quest}
+    return create_entity('quest', entity_id, data)
 
 
 def create_faction(entity_id, data):
     """Create a new faction."""
-    faction = {
-        "id": entity_id,
-        "type": "faction",
-        "name": data.get('name', entity_id),
-        "description": data.get('description', ''),
-        "alignment": data.get('alignment', 'neutral'),
-        "leader": data.get('leader', ''),
-        "headquarters": data.get('headquarters', ''),
-        "goals": data.get('goals', []),
-        "allies": data.get('allies', []),
-        "enemies": data.get('enemies', []),
-        "members": data.get('members', []),
-        "resources": data.get('resources', []),
-        "reputation": data.get('reputation', 0),
-        "notes": data.get('notes', ''),
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
-    
-    path = save_entity('faction', entity_id, faction)
-    return {"created": True, "path": path, "entity": faction}
+    return create_entity('faction', entity_id, data)
 
 
 def update_world_state(entity_type, entity_id, data):
@@ -194,31 +163,33 @@ def update_world_state(entity_type, entity_id, data):
     return {"updated": True, "path": path, "entity": entity}
 
 
-def get_world_data(entity_type, entity_id):
-    """Get world data."""
+def get_world_data(entity_type, entity_id, fields=None):
+    """Get world data.
+    
+    When listing, `fields` limits each entity to those top-level keys
+    (e.g. ["id", "name"]); a single entity is always returned whole.
+    """
     if entity_id:
         entity = load_entity(entity_type, entity_id)
         return {"found": entity is not None, "entity": entity}
     
     # List all entities of type
     ensure_world_dirs()
-    type_to_dir = {
-        'location': 'locations',
-        'item': 'items',
-        'quest': 'quests',
-        'faction': 'factions',
-        'npc': 'npcs'
-    }
-    
-    subdir = type_to_dir.get(entity_type, entity_type + 's')
+    subdir = _TYPE_TO_DIR.get(entity_type, entity_type + 's')
     dir_path = f"data/world/{subdir}"
     
     entities = []
     if os.path.exists(dir_path):
-        for filename in os.listdir(dir_path):
-            if filename.endswith('.json'):
-                with open(os.path.join(dir_path, filename), 'r') as f:
-                    entities.append(json.load(f))
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                if entry.name.endswith('.json'):
+                    with open(entry.path, 'rb') as f:
+                        entities.append(_loads(f.read()))
+    
+    if fields:
+        # Entity files are small, so one full orjson parse beats an
+        # incremental parser; only the listing output is trimmed
+        entities = [{k: e[k] for k in fields if k in e} for e in entities]
     
     return {"count": len(entities), "entities": entities}
 
@@ -232,13 +203,19 @@ def main():
     parser.add_argument('--entity-type', default='')
     parser.add_argument('--entity-id', default='')
     parser.add_argument('--data-file', help='Path to JSON data file')
+    parser.add_argument('--fields', default='',
+                       help='Comma-separated fields to keep when listing with get_world_data')
+    parser.add_argument('--compact', action='store_true',
+                       help='Print compact JSON instead of indented output')
     
     args = parser.parse_args()
     
+    fields = [f.strip() for f in args.fields.split(',') if f.strip()]
+    
     data = {}
     if args.data_file and os.path.exists(args.data_file):
-        with open(args.data_file, 'r') as f:
-            data = json.load(f)
+        with open(args.data_file, 'rb') as f:
+            data = _loads(f.read())
     
     handlers = {
         'create_location': lambda: create_location(args.entity_id, data),
@@ -247,15 +224,16 @@ def main():
         'create_quest': lambda: create_quest(args.entity_id, data),
         'create_faction': lambda: create_faction(args.entity_id, data),
         'update_world_state': lambda: update_world_state(args.entity_type, args.entity_id, data),
-        'get_world_data': lambda: get_world_data(args.entity_type, args.entity_id)
+        'get_world_data': lambda: get_world_data(args.entity_type, args.entity_id, fields)
     }
     
     result = handlers[args.action]()
     
+    output = json.dumps(result, indent=2)
     with open('/tmp/world_result.json', 'w') as f:
-        json.dump(result, f, indent=2)
+        f.write(output)
     
-    print(json.dumps(result, indent=2))
+    print(json.dumps(result, separators=(',', ':')) if args.compact else output)
     return 0
 
 